@@ -0,0 +1,106 @@
+import re
+import runpy
+import threading
+import time
+
+
+class ExpectTimeout(Exception):
+    """等待的模式在超时前没有出现"""
+
+
+class ExpectSession:
+    """基于已打开会话的 expect 风格脚本接口
+
+    通过 SSHClient 的数据监听获取输出，等待中的 expect 在新数据到达时
+    由条件变量唤醒，不轮询也不休眠。
+
+    用法::
+
+        session.expect(r'[$#] $')
+        session.sendline('sudo systemctl restart nginx')
+        index, match = session.expect_any([r'password', r'[$#] $'], timeout=10)
+    """
+    def __init__(self, ssh_client, max_buffer=1024 * 1024):
+        self.ssh_client = ssh_client
+        self.max_buffer = max_buffer
+        self.buffer = ""
+        self.condition = threading.Condition()
+        ssh_client.add_listener(self._on_data)
+
+    def _on_data(self, data):
+        with self.condition:
+            self.buffer += data
+            if len(self.buffer) > self.max_buffer:
+                self.buffer = self.buffer[-self.max_buffer:]
+            self.condition.notify_all()
+
+    def send(self, text):
+        """原样发送文本"""
+        self.ssh_client.send_keys(text)
+
+    def sendline(self, text=""):
+        """发送一行命令"""
+        self.send(text + "\n")
+
+    def expect(self, pattern, timeout=30):
+        """等待模式出现，返回匹配对象；超时抛出 ExpectTimeout"""
+        return self.expect_any([pattern], timeout)[1]
+
+    def expect_any(self, patterns, timeout=30):
+        """等待多个模式中最先出现的一个，返回 (序号, 匹配对象)
+
+        匹配位置之前（含匹配部分）的输出从缓冲区中移除；timeout 为 None 时一直等待。
+        """
+        compiled = [re.compile(p) if isinstance(p, str) else p for p in patterns]
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.condition:
+            while True:
+                best = None
+                for index, regex in enumerate(compiled):
+                    match = regex.search(self.buffer)
+                    if match and (best is None or match.start() < best[1].start()):
+                        best = (index, match)
+                if best:
+                    self.buffer = self.buffer[best[1].end():]
+                    return best
+
+                if not self.ssh_client.connected:
+                    raise EOFError("连接已断开")
+                if deadline is None:
+                    self.condition.wait()
+                    continue
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise ExpectTimeout(f"等待超时: {[p.pattern for p in compiled]}")
+                self.condition.wait(remaining)
+
+    def close(self):
+        """停止监听会话输出"""
+        self.ssh_client.remove_listener(self._on_data)
+
+
+def run_script(path, targets, progress=None):
+    """在多个会话上并发运行脚本
+
+    脚本需定义 run(session) 函数，session 为 ExpectSession。
+    targets 为 [(标识, ssh_client)]，每个会话完成时以 (标识, 错误或None) 调用 progress。
+    """
+    run = runpy.run_path(path)['run']
+
+    def worker(target, ssh_client):
+        session = ExpectSession(ssh_client)
+        error = None
+        try:
+            run(session)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        finally:
+            session.close()
+        if progress:
+            progress((target, error))
+
+    threads = [threading.Thread(target=worker, args=item, daemon=True) for item in targets]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
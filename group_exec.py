@@ -0,0 +1,106 @@
+import selectors
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from ssh_client import SSHClient
+
+
+class HostResult:
+    """单台主机的非交互执行结果"""
+    def __init__(self, name, stdout="", stderr="", exit_status=None, error=None, elapsed=0):
+        self.name = name
+        self.stdout = stdout
+        self.stderr = stderr
+        self.exit_status = exit_status
+        self.error = error          # 连接或执行失败的原因
+        self.elapsed = elapsed
+
+    def key(self):
+        """用于合并相同输出的键"""
+        return (self.error, self.exit_status, self.stdout, self.stderr)
+
+
+def exec_on_host(name, connect_args, command, timeout=60):
+    """连接主机并执行命令，分别收集标准输出、标准错误和退出码"""
+    start = time.time()
+    client = SSHClient()
+    success, message = client.connect(shell=False, **connect_args)
+    if not success:
+        return HostResult(name, error=message, elapsed=time.time() - start)
+
+    try:
+        chan = client.transport.open_session()
+        chan.exec_command(command)
+        stdout, stderr = [], []
+        deadline = start + timeout
+        # 通道的 fileno 在标准输出或标准错误有数据、以及通道关闭时可读，
+        # 没有数据时阻塞等待而不是轮询，大量主机并发时不会频繁唤醒线程
+        selector = selectors.DefaultSelector()
+        selector.register(chan, selectors.EVENT_READ)
+        try:
+            # 交替读取两个流，避免一方未读占满通道窗口导致另一方阻塞
+            while True:
+                if chan.recv_ready():
+                    stdout.append(chan.recv(65536))
+                elif chan.recv_stderr_ready():
+                    stderr.append(chan.recv_stderr(65536))
+                elif chan.exit_status_ready() and chan.eof_received:
+                    break
+                elif time.time() > deadline:
+                    raise TimeoutError(f"执行超过 {timeout} 秒")
+                else:
+                    # 退出码不经过 fileno 通知，最多等待1秒后重新检查
+                    selector.select(min(deadline - time.time(), 1.0))
+        finally:
+            selector.close()
+        return HostResult(name,
+                          stdout=b''.join(stdout).decode('utf-8', errors='replace'),
+                          stderr=b''.join(stderr).decode('utf-8', errors='replace'),
+                          exit_status=chan.recv_exit_status(),
+                          elapsed=time.time() - start)
+    except Exception as e:
+        return HostResult(name, error=str(e), elapsed=time.time() - start)
+    finally:
+        client.disconnect()
+
+
+def run_group(targets, command, max_workers=64, timeout=60, progress=None):
+    """在有界线程池中对一组主机并发执行命令
+
+    targets 为 [(名称, connect 参数)]；每台主机完成时以 HostResult 调用 progress，
+    总耗时接近最慢主机的耗时（主机数不超过并发数时）。
+    """
+    results = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(exec_on_host, name, args, command, timeout) for name, args in targets]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            if progress:
+                progress(result)
+    return results
+
+
+def aggregate(results):
+    """把输出完全相同的主机合并成组，按组大小降序返回 [(代表结果, [主机名])]"""
+    groups = {}
+    for result in results:
+        groups.setdefault(result.key(), []).append(result)
+    ordered = sorted(groups.values(), key=len, reverse=True)
+    return [(members[0], sorted(r.name for r in members)) for members in ordered]
+
+
+def summarize(results):
+    """生成分组摘要文本，如 "48 台主机: 退出码 0" """
+    lines = []
+    for sample, names in aggregate(results):
+        if sample.error:
+            status = f"失败 ({sample.error})"
+        else:
+            status = f"退出码 {sample.exit_status}"
+        shown = ', '.join(names[:10]) + (' ...' if len(names) > 10 else '')
+        lines.append(f"{len(names)} 台主机: {status}  [{shown}]")
+        output = (sample.stdout + sample.stderr).strip()
+        if output:
+            lines.append('    ' + output.replace('\n', '\n    '))
+    return '\n'.join(lines)
@@ -0,0 +1,130 @@
+import threading
+import paramiko
+
+from port_forward import CHANNEL_OPEN_TIMEOUT
+
+
+class JumpHost:
+    """跳板机地址，格式: [user@]host[:port]"""
+    def __init__(self, hostname, port=22, username=None):
+        self.hostname = hostname
+        self.port = port
+        self.username = username
+
+    @classmethod
+    def parse(cls, text, default_user=None):
+        """解析单个跳板机地址，格式错误时抛出 ValueError"""
+        text = text.strip()
+        username = default_user
+        if '@' in text:
+            username, text = text.rsplit('@', 1)
+        hostname, port = text, 22
+        if ':' in text:
+            hostname, port_text = text.rsplit(':', 1)
+            try:
+                port = int(port_text)
+            except ValueError:
+                raise ValueError(f"无效的跳板机端口: {port_text}")
+        if not hostname:
+            raise ValueError("跳板机主机名不能为空")
+        return cls(hostname, port, username)
+
+    def key(self):
+        return (self.username, self.hostname, self.port)
+
+    def __str__(self):
+        return f"{self.username}@{self.hostname}:{self.port}"
+
+
+def parse_jump_hosts(text, default_user=None):
+    """解析逗号分隔的跳板机链，按连接顺序排列"""
+    return [JumpHost.parse(item, default_user) for item in text.split(',') if item.strip()]
+
+
+class _HopEntry:
+    """缓存中的一条跳板机连接及其引用计数"""
+    def __init__(self, client):
+        self.client = client
+        self.refs = 1
+
+
+class TransportCache:
+    """已认证跳板机连接的共享缓存
+
+    以跳板链前缀为键缓存，多个标签页经过同一跳板机时只握手一次；
+    引用计数归零后关闭连接。acquire 返回的租约记录了实际引用的连接，
+    失效连接被替换后，旧租约的释放不会影响新连接。
+
+    跳板机只使用公钥认证（会话的密钥文件、ssh-agent 和 ~/.ssh 下的默认密钥），
+    会话密码只发给目标主机，不会发给沿途的跳板机。
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}    # 链前缀 -> _HopEntry
+        self._key_locks = {}  # 链前缀 -> 建立连接时使用的锁，避免并发重复握手
+
+    def acquire(self, chain, pkey=None):
+        """返回 (跳板链最后一跳的 Transport, 租约)，沿途连接不存在时依次建立
+
+        pkey 为会话的密钥，会与 ssh-agent 及默认密钥一起用于跳板机认证。
+        """
+        auth = {'allow_agent': True, 'look_for_keys': True}
+        if pkey is not None:
+            auth['pkey'] = pkey
+
+        transport = None
+        lease = []
+        try:
+            for i, hop in enumerate(chain):
+                key = tuple(h.key() for h in chain[:i + 1])
+                entry = self._acquire_hop(key, hop, transport, auth)
+                lease.append((key, entry))
+                transport = entry.client.get_transport()
+        except Exception:
+            self.release(lease)
+            raise
+        return transport, lease
+
+    def release(self, lease):
+        """释放租约中的引用，从最后一跳开始"""
+        for key, entry in reversed(lease):
+            self._release_entry(key, entry)
+
+    def _acquire_hop(self, key, hop, upstream, auth):
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry and entry.client.get_transport() and entry.client.get_transport().is_active():
+                    entry.refs += 1
+                    return entry
+
+            # 经上一跳的 direct-tcpip 通道连接本跳
+            sock = None
+            if upstream is not None:
+                sock = upstream.open_channel('direct-tcpip', (hop.hostname, hop.port), ('127.0.0.1', 0),
+                                             timeout=CHANNEL_OPEN_TIMEOUT)
+            client = paramiko.SSHClient()
+            client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+            client.connect(hop.hostname, port=hop.port, username=hop.username, sock=sock, **auth)
+
+            # 失效的旧连接仍由持有旧租约的标签页引用，等它们释放时再关闭
+            entry = _HopEntry(client)
+            with self._lock:
+                self._entries[key] = entry
+            return entry
+
+    def _release_entry(self, key, entry):
+        with self._lock:
+            entry.refs -= 1
+            if entry.refs > 0:
+                return
+            if self._entries.get(key) is entry:
+                del self._entries[key]
+        entry.client.close()
+
+
+# 全局共享的跳板机连接缓存
+jump_cache = TransportCache()
@@ -0,0 +1,66 @@
+import os
+import threading
+import time
+import paramiko
+
+
+def _load_key_file(path, passphrase=None):
+    """读取并解析私钥文件（含口令派生），依次尝试各种密钥类型"""
+    if hasattr(paramiko.PKey, 'from_path'):
+        return paramiko.PKey.from_path(path, passphrase=passphrase)
+
+    key_classes = [paramiko.RSAKey, paramiko.ECDSAKey, paramiko.Ed25519Key]
+    if hasattr(paramiko, 'DSSKey'):
+        key_classes.append(paramiko.DSSKey)
+    last_error = None
+    for key_class in key_classes:
+        try:
+            return key_class.from_private_key_file(path, password=passphrase)
+        except paramiko.PasswordRequiredException:
+            raise
+        except paramiko.SSHException as e:
+            last_error = e
+    raise last_error
+
+
+class KeyCache:
+    """已解密私钥的内存缓存
+
+    同一密钥文件只在首次使用时读取和解密，之后直接复用 PKey 对象；
+    超过有效期未使用的密钥自动失效，也可通过 forget 立即清除。
+    """
+    def __init__(self, timeout=3600):
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._entries = {}    # (路径, 修改时间) -> [PKey, 最后使用时间]
+
+    def load(self, path, passphrase=None):
+        """返回密钥文件对应的 PKey，缓存未命中时读取并解密"""
+        path = os.path.abspath(os.path.expanduser(path))
+        key = (path, os.path.getmtime(path))
+        now = time.time()
+
+        # 持锁解析，避免同时打开多个标签页时重复进行口令派生
+        with self._lock:
+            self._purge(now)
+            entry = self._entries.get(key)
+            if entry:
+                entry[1] = now
+                return entry[0]
+            pkey = _load_key_file(path, passphrase or None)
+            self._entries[key] = [pkey, now]
+            return pkey
+
+    def forget(self):
+        """清除所有已缓存的密钥"""
+        with self._lock:
+            self._entries.clear()
+
+    def _purge(self, now):
+        expired = [key for key, entry in self._entries.items() if now - entry[1] > self.timeout]
+        for key in expired:
+            del self._entries[key]
+
+
+# 全局共享的密钥缓存
+key_cache = KeyCache()
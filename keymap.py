@@ -0,0 +1,80 @@
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QKeySequence
+
+# 可绑定的动作及说明
+ACTIONS = {
+    'complete': "命令补全",
+    'interrupt': "终止命令",
+    'suspend': "挂起命令 (Ctrl+Z)",
+    'paste': "流式粘贴剪贴板内容",
+    'toggle_raw_mode': "切换字符模式",
+    'previous_command': "跳到上一条命令",
+    'next_command': "跳到下一条命令",
+    'toggle_output': "折叠/展开命令输出",
+    'clear': "清空终端输出",
+    'none': "取消绑定",
+}
+
+DEFAULT_BINDINGS = {
+    'Tab': 'complete',
+    'Ctrl+C': 'interrupt',
+    'Ctrl+Shift+V': 'paste',
+    'Ctrl+Shift+R': 'toggle_raw_mode',
+    'Ctrl+Up': 'previous_command',
+    'Ctrl+Down': 'next_command',
+    'Ctrl+Shift+O': 'toggle_output',
+}
+
+# 参与匹配的修饰键（忽略小键盘等标志）
+MODIFIER_MASK = (Qt.KeyboardModifier.ControlModifier | Qt.KeyboardModifier.ShiftModifier |
+                 Qt.KeyboardModifier.AltModifier | Qt.KeyboardModifier.MetaModifier)
+
+
+def _value(flag):
+    return int(getattr(flag, 'value', flag))
+
+
+def parse_bindings(text):
+    """解析 "按键=动作" 列表（以分号或换行分隔），格式错误时抛出 ValueError"""
+    bindings = {}
+    for item in text.replace('\n', ';').split(';'):
+        if not item.strip():
+            continue
+        if '=' not in item:
+            raise ValueError(f"无效的快捷键设置: {item.strip()}")
+        key, action = (part.strip() for part in item.rsplit('=', 1))
+        if action not in ACTIONS:
+            raise ValueError(f"未知的动作: {action}")
+        if QKeySequence(key).isEmpty():
+            raise ValueError(f"无效的按键: {key}")
+        bindings[key] = action
+    return bindings
+
+
+def format_bindings(bindings):
+    """把绑定表格式化为每行一条的文本"""
+    return '\n'.join(f"{key}={action}" for key, action in bindings.items())
+
+
+class Keymap:
+    """编译后的快捷键表：以 (按键, 修饰键) 为键的哈希表，查找为 O(1)
+
+    绑定按 默认 -> 用户设置 -> 会话覆盖 的顺序叠加，后者优先。
+    """
+    def __init__(self, *layers):
+        self.bindings = dict(DEFAULT_BINDINGS)
+        for layer in layers:
+            self.bindings.update(layer)
+
+        self.table = {}
+        for key, action in self.bindings.items():
+            if action == 'none':
+                continue
+            combination = QKeySequence(key)[0]
+            modifiers = _value(combination.keyboardModifiers()) & _value(MODIFIER_MASK)
+            self.table[(_value(combination.key()), modifiers)] = action
+
+    def lookup(self, event):
+        """返回按键事件绑定的动作，未绑定时返回 None"""
+        modifiers = _value(event.modifiers()) & _value(MODIFIER_MASK)
+        return self.table.get((_value(event.key()), modifiers))
@@ -0,0 +1,67 @@
+import time
+
+
+class EchoPredictor:
+    """预测式本地回显（类似mosh）
+
+    字符模式下用户输入的可打印字符立即显示在本地，服务器回显到达后逐字对齐：
+    一致则确认预测，不一致或超时未确认则撤销尚未确认的预测。
+    """
+    def __init__(self, timeout=1.0):
+        self.enabled = True
+        self.timeout = timeout    # 预测多久未被确认即视为失败（如密码输入时服务器不回显）
+        self.pending = ""         # 已显示但尚未被服务器确认的字符
+        self.pending_since = 0
+        self.suspended = False    # 非可打印按键或预测失败后暂停，直到服务器输出对齐
+
+    def predict(self, text):
+        """记录一次预测，返回是否应在本地显示"""
+        if not self.enabled or self.suspended:
+            return False
+        if not self.pending:
+            self.pending_since = time.time()
+        self.pending += text
+        return True
+
+    def suspend(self):
+        """暂停预测（回车、方向键等服务器行为不可预知的按键）"""
+        self.suspended = True
+
+    def reconcile(self, data):
+        """用服务器输出对齐预测
+
+        返回 (需撤销的本地字符数, 需要渲染的服务器数据)。
+        """
+        if not self.pending:
+            self.suspended = False
+            return 0, data
+
+        common = 0
+        limit = min(len(data), len(self.pending))
+        while common < limit and data[common] == self.pending[common]:
+            common += 1
+
+        if common == len(data):
+            # 服务器输出全部是已显示的预测
+            self.pending = self.pending[common:]
+            self.pending_since = time.time()
+            return 0, ""
+        if common == len(self.pending):
+            # 预测全部确认，其余为新输出
+            self.pending = ""
+            return 0, data[common:]
+
+        # 出现分歧：撤销未确认的预测，从分歧处渲染服务器数据
+        rollback = len(self.pending) - common
+        self.pending = ""
+        self.suspended = True
+        return rollback, data[common:]
+
+    def expire(self):
+        """返回因超时需要撤销的本地字符数"""
+        if self.pending and time.time() - self.pending_since > self.timeout:
+            rollback = len(self.pending)
+            self.pending = ""
+            self.suspended = True
+            return rollback
+        return 0
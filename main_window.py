@@ -1,21 +1,39 @@
 from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
                            QLabel, QLineEdit, QPushButton, QTextEdit, 
                            QTabWidget, QListWidget, QFormLayout, QMessageBox,
-                           QSpinBox, QFileDialog, QCheckBox, QSplitter, QApplication)
-from PyQt6.QtCore import Qt, QSettings, QEvent, QObject, QTimer
-from PyQt6.QtGui import QFont, QColor, QPalette, QKeyEvent, QTextCursor
+                           QSpinBox, QFileDialog, QCheckBox, QSplitter, QApplication,
+                           QComboBox, QDialog, QTableWidget, QTableWidgetItem, QListWidgetItem,
+                           QProgressDialog, QInputDialog)
+from PyQt6.QtCore import Qt, QSettings, QEvent, QObject, QTimer, pyqtSignal
+from PyQt6.QtGui import QFont, QColor, QPalette, QKeyEvent, QTextCursor, QKeySequence
 import re  # 添加正则表达式支持
 import os  # 添加os模块支持
 import time  # 添加time模块支持
+import threading
 
 # 添加缺失的导入
 from ssh_client import SSHClient
+from process_client import ProcessSSHClient
+from port_forward import parse_forwards
+from jump_host import parse_jump_hosts
+from local_echo import EchoPredictor
+from terminal_text import strip_escapes, strip_osc, clean_line_output
+from key_cache import key_cache
+from scrollback import TabBuffer
+from transport_profile import PROFILES, auto_tune
+from expect import run_script
+from group_exec import run_group, summarize
+from shell_integration import BASH_HOOK
+from paste_engine import PasteJob
+from prewarm import prewarmer
+from keymap import ACTIONS, Keymap, parse_bindings, format_bindings
 
 class GlobalEventFilter(QObject):
-    """全局事件过滤器，用于捕获Tab键和Ctrl+C"""
-    def __init__(self, terminal_inputs=None):
+    """全局事件过滤器，按编译后的快捷键表分发终端输入框的按键"""
+    def __init__(self):
         super().__init__()
-        self.terminal_inputs = terminal_inputs or []  # 存储所有终端输入框的引用
+        # 终端输入框 -> (终端输出, SSH客户端, 快捷键表, 动作处理函数)
+        self.terminals = {}
     
     def reset_completion_state(self, input_box, ssh_client):
         """重置补全状态"""
@@ -23,65 +41,116 @@ class GlobalEventFilter(QObject):
         ssh_client.tab_completion = False
     
     def eventFilter(self, obj, event):
-        # 处理按键事件
-        if (event.type() == QEvent.Type.KeyPress and 
-            isinstance(event, QKeyEvent)):
-            
-            # 检查是否有活动的终端输入框
-            for input_box, terminal_output, ssh_client in self.terminal_inputs:
-                if input_box.hasFocus() and ssh_client and ssh_client.connected:
-                    # 处理Tab键
-                    if event.key() == Qt.Key.Key_Tab:
-                        try:
-                            # 记录当前命令
-                            current_text = input_box.text()
-                            if not current_text:
-                                return True
-                            
-                            # 记录原始命令和状态
-                            if not input_box.tab_completion_active:
-                                input_box.original_command = current_text
-                                input_box.tab_completion_active = True
-                                ssh_client.current_command = current_text
-                                
-                                # 先发送当前命令
-                                ssh_client.channel.send(current_text.encode())
-                                time.sleep(0.05)
-                            
-                            # 发送Tab
-                            ssh_client.send_raw("\t")
-                            
-                            # 强制保持焦点
-                            input_box.setFocus(Qt.FocusReason.OtherFocusReason)
-                            
-                            return True
-                            
-                        except Exception as e:
-                            if terminal_output:
-                                terminal_output.append(f"\n[错误] Tab发送失败: {str(e)}")
-                            # 确保在异常情况下重置状态
-                            input_box.tab_completion_active = False
-                            ssh_client.tab_completion = False
-                            return True
-                    
-                    # 处理Ctrl+C
-                    elif event.key() == Qt.Key.Key_C and event.modifiers() & Qt.KeyboardModifier.ControlModifier:
-                        try:
-                            ssh_client.channel.send(b'\x03')  # Ctrl+C
-                            return True
-                        except Exception as e:
-                            pass
-        
-        # 默认处理
-        return super().eventFilter(obj, event)
+        # 只处理按键事件；按键事件首先发给有焦点的控件，直接按对象查表，与标签页数量无关
+        if event.type() != QEvent.Type.KeyPress or not isinstance(event, QKeyEvent):
+            return super().eventFilter(obj, event)
+        
+        entry = self.terminals.get(obj)
+        if entry is None:
+            return super().eventFilter(obj, event)
+        
+        terminal_output, ssh_client, keymap, actions = entry
+        action = keymap.lookup(event)
+        handler = actions.get(action)
+        if handler is None or not ssh_client or not ssh_client.connected:
+            return super().eventFilter(obj, event)
+        
+        try:
+            handler()
+        except Exception as e:
+            if terminal_output:
+                terminal_output.append(f"\n[错误] 快捷键 {ACTIONS[action]} 执行失败: {str(e)}")
+        return True
+    
+    def complete(self, input_box, terminal_output, ssh_client):
+        """命令补全：发送当前命令和Tab，由远端完成补全"""
+        # 字符模式下Tab直接交给远端处理
+        if input_box.raw_mode:
+            input_box.queue_keys("\t")
+            return
+        
+        try:
+            # 记录当前命令
+            current_text = input_box.text()
+            if not current_text:
+                return
+            
+            # 记录原始命令和状态
+            if not input_box.tab_completion_active:
+                input_box.original_command = current_text
+                input_box.tab_completion_active = True
+                ssh_client.current_command = current_text
+                
+                # 先发送当前命令
+                ssh_client.channel.send(current_text.encode())
+                time.sleep(0.05)
+            
+            # 发送Tab
+            ssh_client.send_raw("\t")
+            
+            # 强制保持焦点
+            input_box.setFocus(Qt.FocusReason.OtherFocusReason)
+            
+        except Exception as e:
+            if terminal_output:
+                terminal_output.append(f"\n[错误] Tab发送失败: {str(e)}")
+            # 确保在异常情况下重置状态
+            self.reset_completion_state(input_box, ssh_client)
+
+    def interrupt(self, input_box, ssh_client):
+        """Ctrl+C：行模式下同时丢弃积压输出，使中断立即生效
+
+        字符模式下 ^C 排在合并窗口中尚未发出的按键之后立即发送，也不丢弃输出，
+        预测回显仍能与服务器回显对齐。
+        """
+        if input_box.raw_mode:
+            input_box.echo_predictor.suspend()
+            input_box.queue_keys("\x03")
+            input_box.flush_keys()
+        else:
+            ssh_client.interrupt()
 
-    def register_terminal(self, input_box, terminal_output, ssh_client):
-        """注册终端输入框"""
-        self.terminal_inputs.append((input_box, terminal_output, ssh_client))
+    def register_terminal(self, input_box, terminal_output, ssh_client, keymap=None, actions=None):
+        """注册终端输入框及其快捷键表，actions 可补充或覆盖默认的动作处理函数"""
+        handlers = {
+            'complete': lambda: self.complete(input_box, terminal_output, ssh_client),
+            'interrupt': lambda: self.interrupt(input_box, ssh_client),
+            'suspend': lambda: ssh_client.send_raw("\x1A"),
+            'paste': lambda: input_box.paste_text(QApplication.clipboard().text()),
+            'toggle_raw_mode': lambda: input_box.set_raw_mode(not input_box.raw_mode),
+            'clear': terminal_output.clear,
+        }
+        handlers.update(actions or {})
+        self.terminals[input_box] = (terminal_output, ssh_client, keymap or Keymap(), handlers)
     
     def unregister_terminal(self, input_box):
         """注销终端输入框"""
-        self.terminal_inputs = [(i, t, s) for i, t, s in self.terminal_inputs if i != input_box]
+        self.terminals.pop(input_box, None)
+
+class BackgroundTask(QObject):
+    """在后台线程中运行耗时函数，通过信号把进度和结果交回界面线程
+
+    函数的第一个参数为进度回调；异常作为结果返回。
+    """
+    progress = pyqtSignal(object)
+    finished = pyqtSignal(object)
+    
+    def __init__(self, func, *args, parent=None):
+        super().__init__(parent)
+        self.func = func
+        self.args = args
+    
+    def start(self):
+        thread = threading.Thread(target=self._run)
+        thread.daemon = True
+        thread.start()
+    
+    def _run(self):
+        try:
+            result = self.func(self.progress.emit, *self.args)
+        except Exception as e:
+            result = e
+        self.finished.emit(result)
 
 class TabCompletionHandler:
     """处理Tab补全功能的辅助类"""
@@ -153,6 +222,8 @@ class MainWindow(QMainWindow):
         self.content_widget = QTabWidget()
         self.content_widget.setTabsClosable(True)
         self.content_widget.tabCloseRequested.connect(self.close_tab)
+        self.content_widget.currentChanged.connect(self.on_tab_changed)
+        self.current_tab = None
         self.main_splitter.addWidget(self.content_widget)
         
         # 添加一个默认的连接标签页
@@ -164,6 +235,18 @@ class MainWindow(QMainWindow):
         # 加载保存的连接
         self.load_connections()
         
+        # 预解析常用会话的地址，定期关闭未使用的预热连接
+        self.prewarm_frequent_sessions()
+        self.prewarm_timer = QTimer(self)
+        self.prewarm_timer.timeout.connect(prewarmer.evict_idle)
+        self.prewarm_timer.start(5000)
+        
+        # 定期压缩长时间未查看的后台标签页
+        self.hibernate_after = 300
+        self.hibernate_timer = QTimer(self)
+        self.hibernate_timer.timeout.connect(self.hibernate_idle_tabs)
+        self.hibernate_timer.start(60 * 1000)
+        
         # 设置基本样式
         self.setStyleSheet("""
             QMainWindow {
@@ -318,8 +401,21 @@ class MainWindow(QMainWindow):
         # 会话列表
         self.session_list = QListWidget()
         self.session_list.itemDoubleClicked.connect(self.load_session)
+        # 悬停或选中会话时预热连接
+        self.session_list.setMouseTracking(True)
+        self.session_list.itemEntered.connect(self.prewarm_session)
+        self.session_list.currentItemChanged.connect(lambda current, previous: self.prewarm_session(current))
         layout.addWidget(self.session_list)
         
+        # 连接预热开关（全局设置）
+        app_settings = QSettings("SSH客户端", "设置")
+        self.prewarm_check = QCheckBox("预热连接")
+        self.prewarm_check.setToolTip("选中或悬停会话时提前完成DNS解析、TCP连接和密钥交换")
+        self.prewarm_check.setChecked(app_settings.value("prewarm", "false") == "true")
+        self.prewarm_check.toggled.connect(self.toggle_prewarm)
+        prewarmer.enabled = self.prewarm_check.isChecked()
+        layout.addWidget(self.prewarm_check)
+        
         # 按钮区域
         button_layout = QHBoxLayout()
         
@@ -341,6 +437,24 @@ class MainWindow(QMainWindow):
         
         layout.addLayout(button_layout)
         
+        # 在多个已保存会话上批量执行命令
+        group_exec_btn = QPushButton("批量执行")
+        group_exec_btn.clicked.connect(self.open_group_exec)
+        group_exec_btn.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        layout.addWidget(group_exec_btn)
+        
+        # 清除内存中已解密的密钥
+        forget_keys_btn = QPushButton("忘记密钥")
+        forget_keys_btn.clicked.connect(self.forget_keys)
+        forget_keys_btn.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        layout.addWidget(forget_keys_btn)
+        
+        # 自定义快捷键（全局设置，会话中可单独覆盖）
+        keymap_btn = QPushButton("快捷键...")
+        keymap_btn.clicked.connect(self.edit_keymap)
+        keymap_btn.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        layout.addWidget(keymap_btn)
+        
         # 添加到主分割器
         self.main_splitter.addWidget(session_panel)
     
@@ -361,6 +475,38 @@ class MainWindow(QMainWindow):
         self.password = QLineEdit()
         self.password.setEchoMode(QLineEdit.EchoMode.Password)
         self.use_key = QCheckBox("使用密钥文件")
+        self.use_agent = QCheckBox("使用 ssh-agent")
+        self.forwards = QLineEdit()
+        self.forwards.setPlaceholderText("L:8080:host:80, R:9000:localhost:3000, D:1080")
+        self.jump_hosts = QLineEdit()
+        self.jump_hosts.setPlaceholderText("user@bastion:22, user@inner-bastion:22")
+        self.use_process = QCheckBox("在独立进程中运行（繁忙会话不影响界面）")
+        self.shell_integration = QCheckBox("启用 Shell 集成（OSC 133，自动注入 bash 提示符钩子）")
+        self.keymap_overrides = QLineEdit()
+        self.keymap_overrides.setPlaceholderText("F5=interrupt; Ctrl+L=clear")
+        
+        # 粘贴设置：限速和括号粘贴模式，适用于处理不过来的网络设备
+        self.paste_rate = QSpinBox()
+        self.paste_rate.setRange(0, 1024 * 1024)
+        self.paste_rate.setSuffix(" KB/s")
+        self.paste_rate.setSpecialValueText("不限速")
+        self.bracketed_paste = QCheckBox("粘贴时使用括号粘贴模式")
+        
+        # 传输配置及自动调优
+        profile_widget = QWidget()
+        profile_layout = QHBoxLayout(profile_widget)
+        profile_layout.setContentsMargins(0, 0, 0, 0)
+        
+        self.transport_profile = QComboBox()
+        for profile in PROFILES.values():
+            self.transport_profile.addItem(profile.title, profile.name)
+        
+        tune_btn = QPushButton("自动调优")
+        tune_btn.clicked.connect(lambda: self.auto_tune_profile(tune_btn))
+        tune_btn.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        
+        profile_layout.addWidget(self.transport_profile, 1)
+        profile_layout.addWidget(tune_btn)
         
         # 密钥文件选择
         key_widget = QWidget()
@@ -384,7 +530,16 @@ class MainWindow(QMainWindow):
         form_layout.addRow("用户名:", self.username)
         form_layout.addRow("密码:", self.password)
         form_layout.addRow(self.use_key)
+        form_layout.addRow(self.use_agent)
         form_layout.addRow("密钥文件:", key_widget)
+        form_layout.addRow("跳板机:", self.jump_hosts)
+        form_layout.addRow("端口转发:", self.forwards)
+        form_layout.addRow("传输配置:", profile_widget)
+        form_layout.addRow(self.use_process)
+        form_layout.addRow(self.shell_integration)
+        form_layout.addRow("粘贴速率:", self.paste_rate)
+        form_layout.addRow(self.bracketed_paste)
+        form_layout.addRow("快捷键覆盖:", self.keymap_overrides)
         
         # 添加到标签页布局
         tab_layout.addLayout(form_layout)
@@ -418,7 +573,8 @@ class MainWindow(QMainWindow):
         """切换密钥认证"""
         key_file.setEnabled(checked)
         browse_btn.setEnabled(checked)
-        self.password.setEnabled(not checked)
+        # 使用密钥时密码框用于输入密钥口令（不保存）
+        self.password.setPlaceholderText("密钥口令（可选）" if checked else "")
     
     def browse_key_file(self):
         """浏览密钥文件"""
@@ -436,6 +592,14 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "输入错误", "请输入主机名和用户名")
             return
         
+        try:
+            forwards = parse_forwards(self.forwards.text())
+            jump_hosts = parse_jump_hosts(self.jump_hosts.text(), username)
+            keymap = Keymap(self.user_bindings(), parse_bindings(self.keymap_overrides.text()))
+        except ValueError as e:
+            QMessageBox.warning(self, "输入错误", str(e))
+            return
+        
         # 创建终端标签页
         terminal_tab = QWidget()
         terminal_tab.setStyleSheet("background-color: #000000;")  # 设置整个标签页为黑色背景
@@ -463,8 +627,145 @@ class MainWindow(QMainWindow):
         # 将自动滚动函数附加到终端输出对象
         terminal_output.ensure_visible = ensure_visible
         
-        # 创建SSH客户端
-        ssh_client = SSHClient()
+        # 后台标签页的轻量输出模型
+        terminal_tab.scrollback = TabBuffer()
+        
+        # Shell集成：命令块记录；dropped_lines 为已从文档顶部移除的行数，用于换算行号
+        terminal_tab.shell_integration_active = False
+        terminal_tab.command_blocks = []
+        terminal_tab.block_cursor = -1
+        terminal_tab.dropped_lines = 0
+        
+        def output_line_count():
+            return terminal_tab.dropped_lines + terminal_output.document().blockCount()
+        
+        def render_text(text, raw):
+            """渲染文本，并统计因文档行数上限被挤掉的行"""
+            document = terminal_output.document()
+            was_empty = document.isEmpty()
+            before = document.blockCount()
+            if raw:
+                command_input.render_output(text)
+                expected = before + text.count('\n')
+            else:
+                terminal_output.append(text)
+                expected = (0 if was_empty else before) + text.count('\n') + 1
+            terminal_tab.dropped_lines += max(0, expected - document.blockCount())
+        
+        def write_output(text, raw=False):
+            """写入终端输出，隐藏的标签页只记录到轻量模型，切换回来时一次性渲染"""
+            if self.content_widget.currentWidget() is not terminal_tab:
+                terminal_tab.scrollback.defer(text, raw)
+                return
+            render_text(text, raw)
+            terminal_output.ensure_visible()
+        
+        def handle_block_event(event):
+            """处理 OSC 133 命令标记，记录命令块在输出中的行号"""
+            kind, block = event
+            terminal_tab.shell_integration_active = True
+            blocks = terminal_tab.command_blocks
+            if kind == 'prompt':
+                # 新提示符出现，补全过程结束
+                command_input.tab_completion_active = False
+                ssh_client.tab_completion = False
+            elif kind == 'start':
+                block.first_line = output_line_count()
+                blocks.append(block)
+                if len(blocks) > 10000:
+                    del blocks[:1000]
+            elif kind == 'end' and blocks and blocks[-1].index == block.index:
+                current = blocks[-1]
+                current.exit_code = block.exit_code
+                current.end_time = block.end_time
+                current.byte_count = block.byte_count
+                current.last_line = output_line_count() - 1
+        
+        def on_block_event(event):
+            if self.content_widget.currentWidget() is not terminal_tab:
+                terminal_tab.scrollback.defer(event, None)
+                return
+            handle_block_event(event)
+        
+        def restore_output():
+            """标签页变为可见：展开压缩的回滚内容并渲染隐藏期间的输出"""
+            scrollback = terminal_tab.scrollback
+            scrollback.hidden_since = None
+            if scrollback.hibernated:
+                terminal_output.setPlainText(scrollback.expand())
+            for raw, text in scrollback.take_pending():
+                if raw is None:
+                    handle_block_event(text)
+                else:
+                    render_text(text, raw)
+            terminal_output.ensure_visible()
+        
+        def selected_block():
+            blocks = terminal_tab.command_blocks
+            if not blocks:
+                return None
+            return blocks[terminal_tab.block_cursor] if terminal_tab.block_cursor >= 0 else blocks[-1]
+        
+        def jump_to_command(step):
+            """跳转到上一条/下一条命令的位置"""
+            blocks = terminal_tab.command_blocks
+            if not blocks:
+                return
+            if terminal_tab.block_cursor < 0:
+                terminal_tab.block_cursor = len(blocks)
+            terminal_tab.block_cursor = max(0, min(len(blocks) - 1, terminal_tab.block_cursor + step))
+            
+            # 从命令行本身开始显示
+            line = selected_block().first_line - terminal_tab.dropped_lines - 1
+            text_block = terminal_output.document().findBlockByNumber(max(line, 0))
+            if text_block.isValid():
+                terminal_output.setTextCursor(QTextCursor(text_block))
+                terminal_output.ensureCursorVisible()
+        
+        def toggle_command_output():
+            """折叠或展开选中命令的输出"""
+            block = selected_block()
+            if not block or block.last_line is None:
+                return
+            document = terminal_output.document()
+            block.collapsed = not block.collapsed
+            last = block.last_line - terminal_tab.dropped_lines
+            text_block = document.findBlockByNumber(max(block.first_line - terminal_tab.dropped_lines, 0))
+            start = end = text_block.position()
+            while text_block.isValid() and text_block.blockNumber() <= last:
+                text_block.setVisible(not block.collapsed)
+                end = text_block.position() + text_block.length()
+                text_block = text_block.next()
+            document.markContentsDirty(start, end - start)
+            terminal_output.viewport().update()
+        
+        def show_command_history():
+            """显示最近的命令、退出码、耗时和输出字节数"""
+            lines = []
+            for block in terminal_tab.command_blocks[-50:]:
+                duration = block.duration()
+                status = "运行中" if duration is None else f"退出码 {block.exit_code}  耗时 {duration:.2f}s"
+                lines.append(f"{block.command}  [{status}  {block.byte_count} 字节]")
+            QMessageBox.information(self, "命令记录", '\n'.join(lines) or "暂无命令记录")
+        
+        def clear_output():
+            """清屏，命令块记录的行号随之失效，一并清空"""
+            terminal_output.clear()
+            terminal_tab.dropped_lines = 0
+            terminal_tab.command_blocks = []
+            terminal_tab.block_cursor = -1
+        
+        def hibernate_output():
+            """压缩回滚内容并释放文档占用的内存"""
+            terminal_tab.scrollback.compress(terminal_output.toPlainText())
+            terminal_output.clear()
+        
+        terminal_tab.write_output = write_output
+        terminal_tab.restore_output = restore_output
+        terminal_tab.hibernate_output = hibernate_output
+        
+        # 创建SSH客户端（独立进程模式下由工作进程负责收发和解析）
+        ssh_client = ProcessSSHClient() if self.use_process.isChecked() else SSHClient()
         
         # 添加右键菜单
         terminal_output.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
@@ -475,12 +776,58 @@ class MainWindow(QMainWindow):
             
             # 添加终止命令选项
             terminate_action = menu.addAction("终止命令 (Ctrl+C)")
-            terminate_action.triggered.connect(lambda: ssh_client.send_raw("\x03"))
+            terminate_action.triggered.connect(ssh_client.interrupt)
             
             # 添加中断选项
             interrupt_action = menu.addAction("中断 (Ctrl+Z)")
             interrupt_action.triggered.connect(lambda: ssh_client.send_raw("\x1A"))
             
+            # 端口转发统计
+            if ssh_client.forwarder:
+                stats_action = menu.addAction("端口转发统计")
+                stats_action.triggered.connect(lambda: QMessageBox.information(
+                    self, "端口转发统计", '\n'.join(ssh_client.forwarder.stats())))
+            
+            menu.addSeparator()
+            
+            # Shell集成：命令间跳转和折叠输出
+            if terminal_tab.shell_integration_active:
+                prev_action = menu.addAction("上一条命令")
+                prev_action.triggered.connect(lambda: jump_to_command(-1))
+                next_action = menu.addAction("下一条命令")
+                next_action.triggered.connect(lambda: jump_to_command(1))
+                collapse_action = menu.addAction("折叠/展开命令输出")
+                collapse_action.triggered.connect(toggle_command_output)
+                history_action = menu.addAction("命令记录")
+                history_action.triggered.connect(show_command_history)
+                menu.addSeparator()
+            
+            # 字符模式：按键直接发送到远端，支持交互式程序
+            raw_mode_action = menu.addAction("字符模式")
+            raw_mode_action.setCheckable(True)
+            raw_mode_action.setChecked(command_input.raw_mode)
+            raw_mode_action.toggled.connect(lambda checked: (command_input.set_raw_mode(checked),
+                                                             prompt_label.setVisible(not checked)))
+            
+            # 流式粘贴剪贴板内容
+            paste_action = menu.addAction("粘贴到终端 (Ctrl+V)")
+            paste_action.triggered.connect(lambda: command_input.paste_text(QApplication.clipboard().text()))
+            
+            # expect 脚本
+            script_action = menu.addAction("运行脚本...")
+            script_action.triggered.connect(lambda: self.run_script([terminal_tab]))
+            script_all_action = menu.addAction("在所有标签页运行脚本...")
+            script_all_action.triggered.connect(
+                lambda: self.run_script([self.content_widget.widget(i) for i in range(self.content_widget.count())]))
+            
+            menu.addSeparator()
+            
+            # 快进模式：输出刷屏时只渲染最后若干行
+            fast_forward_action = menu.addAction("快进模式")
+            fast_forward_action.setCheckable(True)
+            fast_forward_action.setChecked(ssh_client.fast_forward)
+            fast_forward_action.toggled.connect(lambda checked: setattr(ssh_client, 'fast_forward', checked))
+            
             menu.exec(terminal_output.mapToGlobal(pos))
         
         terminal_output.customContextMenuRequested.connect(show_context_menu)
@@ -501,6 +848,8 @@ class MainWindow(QMainWindow):
         
         # 命令输入框
         command_input = TerminalInput(ssh_client, terminal_output)
+        command_input.paste_rate = self.paste_rate.value() * 1024
+        command_input.bracketed_paste = self.bracketed_paste.isChecked()
 
         # 命令历史功能
         command_history = []
@@ -514,33 +863,35 @@ class MainWindow(QMainWindow):
         terminal_layout.addWidget(input_widget, 0)
         
         # 修改终端输出处理函数
-        def update_terminal(data):
+        def update_terminal(data, frame=False):
             try:
-                # 处理ANSI转义序列和控制字符
+                # 处理ANSI转义序列和控制字符（独立进程模式下已由工作进程完成）
                 clean_data = data
+                if not ssh_client.pre_cleaned:
+                    clean_data = strip_escapes(clean_data)
                 
-                # 转义序列处理
-                clean_data = re.sub(r'\x1b\[\d+(?:;\d+)*[mK]', '', clean_data)
-                clean_data = re.sub(r'\x1b\[\d*[ABCDEFGHJKST]', '', clean_data)
-                
-                # 控制字符处理
-                control_chars = ['\x07', '\x08', '\x0b', '\x0c', '\x0e', '\x0f', '\x10', 
-                                '\x11', '\x12', '\x13', '\x14', '\x15', '\x16', '\x17', 
-                                '\x18', '\x19', '\x1a', '\x1c', '\x1d', '\x1e', '\x1f']
-                for char in control_chars:
-                    clean_data = clean_data.replace(char, '')
+                # 字符模式：原样渲染（含提示符），并与本地预测回显对齐
+                if command_input.raw_mode:
+                    if not ssh_client.pre_cleaned:
+                        clean_data = strip_osc(clean_data)
+                    write_output(clean_data, raw=True)
+                    return
                 
-                # 换行符处理
-                clean_data = clean_data.replace('\r\n', '\n')
-                clean_data = clean_data.replace('\r', '\n')
+                # 控制字符、换行符及其他特殊序列
+                if not ssh_client.pre_cleaned:
+                    clean_data = clean_line_output(clean_data)
                 
-                # 其他特殊序列
-                clean_data = re.sub(r'\x1b\][^\a]*(?:\a|\x1b\\)', '', clean_data)
+                # 限制历史大小（隐藏的标签页不触碰文档）
+                if self.content_widget.currentWidget() is terminal_tab:
+                    current_text = terminal_output.toPlainText()
+                    if len(current_text) > 100000:
+                        terminal_tab.dropped_lines += current_text[:-50000].count('\n')
+                        terminal_output.setPlainText(current_text[-50000:])
                 
-                # 限制历史大小
-                current_text = terminal_output.toPlainText()
-                if len(current_text) > 100000:
-                    terminal_output.setPlainText(current_text[-50000:])
+                # 快进帧：合并了多条输出（通常以提示符结尾），整屏显示，不做补全和提示符判断
+                if frame:
+                    write_output(clean_data.strip())
+                    return
                 
                 # 检查Tab补全结果
                 if command_input.tab_completion_active:
@@ -575,7 +926,7 @@ class MainWindow(QMainWindow):
                             # 先显示原始输出（但不包括命令提示符部分）
                             output_lines = []
                             for line in clean_data.strip().split('\n'):
-                                if not (']#' in line or '$' in line):
+                                if terminal_tab.shell_integration_active or not (']#' in line or '$' in line):
                                     output_lines.append(line)
                             if output_lines:
                                 terminal_output.append('\n'.join(output_lines))
@@ -601,8 +952,8 @@ class MainWindow(QMainWindow):
                                     command_input.setText(full_command)
                                     command_input.setCursorPosition(len(full_command))
                         
-                        # 重置补全状态
-                        if ']#' in clean_data or '$' in clean_data:
+                        # 重置补全状态（启用Shell集成后由提示符标记重置）
+                        if not terminal_tab.shell_integration_active and (']#' in clean_data or '$' in clean_data):
                             command_input.tab_completion_active = False
                             ssh_client.tab_completion = False
                         
@@ -615,43 +966,55 @@ class MainWindow(QMainWindow):
                 
                 # 只有在非补全状态下才显示命令输出
                 elif clean_data.strip():
-                    # 检查是否是命令提示符行
-                    if ']#' in clean_data or '$' in clean_data:
+                    # 检查是否是命令提示符行（启用Shell集成后提示符已在接收时分离）
+                    if not terminal_tab.shell_integration_active and (']#' in clean_data or '$' in clean_data):
                         # 如果是命令提示符行，不显示
                         return
-                    terminal_output.append(clean_data.strip())
-                    
-                    # 使用自定义方法自动滚动到底部
-                    terminal_output.ensure_visible()
+                    # 写入输出并自动滚动到底部
+                    write_output(clean_data.strip())
             
             except Exception as e:
                 # 出错时显示原始数据
-                terminal_output.append(data)
-                # 确保滚动到底部
-                terminal_output.ensure_visible()
+                write_output(data)
         
         # 连接服务器
-        success = False
-        if self.use_key.isChecked():
-            key_file = self.key_file.text()
-            success, message = ssh_client.connect(host, port, username, key_file=key_file)
-        else:
-            password = self.password.text()
-            success, message = ssh_client.connect(host, port, username, password=password)
+        success, message = ssh_client.connect(**self.form_connect_args(jump_hosts),
+                                              transport_profile=self.transport_profile.currentData())
         
         if success:
             # 启动接收数据
+            ssh_client.block_callback = on_block_event
             ssh_client.start_receiving(update_terminal)
             
+            # 定时在界面线程中渲染接收队列，渲染跟不上时接收线程会自动停止读取
+            render_timer = QTimer(terminal_tab)
+            render_timer.timeout.connect(ssh_client.process_pending)
+            render_timer.start(30)
+            
             # 初始欢迎信息
             update_terminal(f"连接到 {username}@{host}:{port}\n")
             
-            # 注册到全局事件过滤器 - 确保使用正确的参数
-            self.event_filter.register_terminal(command_input, terminal_output, ssh_client)
+            # 注册到全局事件过滤器，命令块导航和字符模式切换需要用到本标签页的状态
+            self.event_filter.register_terminal(command_input, terminal_output, ssh_client, keymap, {
+                'previous_command': lambda: jump_to_command(-1),
+                'next_command': lambda: jump_to_command(1),
+                'toggle_output': toggle_command_output,
+                'clear': clear_output,
+                'toggle_raw_mode': lambda: (command_input.set_raw_mode(not command_input.raw_mode),
+                                            prompt_label.setVisible(not command_input.raw_mode)),
+            })
+            
+            # 启动端口转发
+            for error in ssh_client.start_forwarding(forwards):
+                terminal_output.append(f"[错误] 端口转发失败: {error}")
             
             # 打印确认信息
             terminal_output.append("\n按Tab键可以进行命令补全")
             
+            # 注入 OSC 133 提示符钩子
+            if self.shell_integration.isChecked():
+                ssh_client.send_command(BASH_HOOK)
+            
             # 清理函数
             def cleanup_terminal():
                 self.event_filter.unregister_terminal(command_input)
@@ -691,9 +1054,106 @@ class MainWindow(QMainWindow):
             
             # 保存SSH客户端实例
             terminal_tab.ssh_client = ssh_client
+            
+            # 记录已保存会话的使用次数，用于预热常用会话
+            session_name = self.session_name.text()
+            if session_name and self.session_list.findItems(session_name, Qt.MatchFlag.MatchExactly):
+                settings = QSettings("SSH客户端", "连接")
+                settings.beginGroup(session_name)
+                settings.setValue("connect_count", int(settings.value("connect_count", 0)) + 1)
+                settings.endGroup()
         else:
             QMessageBox.critical(self, "连接失败", message)
     
+    def form_connect_args(self, jump_hosts):
+        """根据表单生成 SSHClient.connect 的参数"""
+        args = {'hostname': self.hostname.text(), 'port': self.port.value(),
+                'username': self.username.text(), 'password': self.password.text(),
+                'jump_hosts': jump_hosts, 'use_agent': self.use_agent.isChecked()}
+        if self.use_key.isChecked():
+            args['key_file'] = self.key_file.text()
+        return args
+    
+    def auto_tune_profile(self, tune_btn):
+        """在后台测量各传输配置的吞吐量和回显延迟，选用最优配置"""
+        if not self.hostname.text() or not self.username.text():
+            QMessageBox.warning(self, "输入错误", "请输入主机名和用户名")
+            return
+        try:
+            jump_hosts = parse_jump_hosts(self.jump_hosts.text(), self.username.text())
+        except ValueError as e:
+            QMessageBox.warning(self, "输入错误", str(e))
+            return
+        
+        # 表单控件属于当前连接标签页，结果回来时可能已被新标签页替换
+        session_name = self.session_name.text()
+        profile_combo = self.transport_profile
+        
+        def on_finished(result):
+            tune_btn.setEnabled(True)
+            tune_btn.setText("自动调优")
+            if isinstance(result, Exception):
+                QMessageBox.critical(self, "自动调优失败", str(result))
+                return
+            
+            best, results = result
+            lines = []
+            for name, rtt, value in results:
+                if rtt is None:
+                    lines.append(f"{PROFILES[name].title}: 失败 ({value})")
+                else:
+                    lines.append(f"{PROFILES[name].title}: 回显 {rtt * 1000:.1f} ms, "
+                                 f"吞吐 {value / 1024 / 1024:.1f} MB/s")
+            if best is None:
+                QMessageBox.critical(self, "自动调优失败", '\n'.join(lines))
+                return
+            
+            # 选用并保存最优配置
+            profile_combo.setCurrentIndex(profile_combo.findData(best))
+            # 只写入已保存的会话，否则会在会话列表中留下只有传输配置的空会话
+            if session_name and self.session_list.findItems(session_name, Qt.MatchFlag.MatchExactly):
+                settings = QSettings("SSH客户端", "连接")
+                settings.beginGroup(session_name)
+                settings.setValue("transport_profile", best)
+                settings.endGroup()
+            lines.append(f"\n已选用: {PROFILES[best].title}")
+            QMessageBox.information(self, "自动调优完成", '\n'.join(lines))
+        
+        task = BackgroundTask(lambda progress, args: auto_tune(args, progress=progress),
+                              self.form_connect_args(jump_hosts), parent=self)
+        task.progress.connect(tune_btn.setText)
+        task.finished.connect(on_finished)
+        task.finished.connect(task.deleteLater)
+        tune_btn.setEnabled(False)
+        task.start()
+    
+    def run_script(self, tabs):
+        """在指定的终端标签页上并发运行 expect 脚本（脚本需定义 run(session)）"""
+        path, _ = QFileDialog.getOpenFileName(self, "选择脚本", "", "Python 脚本 (*.py)")
+        if not path:
+            return
+        
+        targets = [(tab, tab.ssh_client) for tab in tabs
+                   if getattr(tab, 'ssh_client', None) and tab.ssh_client.connected]
+        script_name = os.path.basename(path)
+        
+        def on_progress(item):
+            tab, error = item
+            if error is None:
+                tab.write_output(f"[脚本] {script_name} 运行完成")
+            else:
+                tab.write_output(f"[脚本] {script_name} 运行失败: {error}")
+        
+        def on_finished(result):
+            if isinstance(result, Exception):
+                QMessageBox.critical(self, "脚本错误", str(result))
+        
+        task = BackgroundTask(lambda progress: run_script(path, targets, progress), parent=self)
+        task.progress.connect(on_progress)
+        task.finished.connect(on_finished)
+        task.finished.connect(task.deleteLater)
+        task.start()
+    
     def save_connection(self):
         """保存连接配置"""
         name = self.session_name.text()
@@ -713,6 +1173,15 @@ class MainWindow(QMainWindow):
         settings.setValue("port", self.port.value())
         settings.setValue("username", self.username.text())
         settings.setValue("use_key", self.use_key.isChecked())
+        settings.setValue("use_agent", self.use_agent.isChecked())
+        settings.setValue("forwards", self.forwards.text())
+        settings.setValue("jump_hosts", self.jump_hosts.text())
+        settings.setValue("use_process", self.use_process.isChecked())
+        settings.setValue("shell_integration", self.shell_integration.isChecked())
+        settings.setValue("paste_rate", self.paste_rate.value())
+        settings.setValue("bracketed_paste", self.bracketed_paste.isChecked())
+        settings.setValue("keymap", self.keymap_overrides.text())
+        settings.setValue("transport_profile", self.transport_profile.currentData())
         
         if not self.use_key.isChecked():
             settings.setValue("password", self.password.text())
@@ -751,6 +1220,16 @@ class MainWindow(QMainWindow):
         self.hostname.setText(settings.value("hostname", ""))
         self.port.setValue(int(settings.value("port", 22)))
         self.username.setText(settings.value("username", ""))
+        self.forwards.setText(settings.value("forwards", ""))
+        self.jump_hosts.setText(settings.value("jump_hosts", ""))
+        self.use_process.setChecked(settings.value("use_process", "false") == "true")
+        self.shell_integration.setChecked(settings.value("shell_integration", "false") == "true")
+        self.paste_rate.setValue(int(settings.value("paste_rate", 0)))
+        self.bracketed_paste.setChecked(settings.value("bracketed_paste", "false") == "true")
+        self.keymap_overrides.setText(settings.value("keymap", ""))
+        self.use_agent.setChecked(settings.value("use_agent", "false") == "true")
+        self.transport_profile.setCurrentIndex(
+            max(0, self.transport_profile.findData(settings.value("transport_profile", "default"))))
         
         use_key = settings.value("use_key", "false") == "true"
         self.use_key.setChecked(use_key)
@@ -782,6 +1261,16 @@ class MainWindow(QMainWindow):
             self.hostname.setText(settings.value("hostname", ""))
             self.port.setValue(int(settings.value("port", 22)))
             self.username.setText(settings.value("username", ""))
+            self.forwards.setText(settings.value("forwards", ""))
+            self.jump_hosts.setText(settings.value("jump_hosts", ""))
+            self.use_process.setChecked(settings.value("use_process", "false") == "true")
+            self.shell_integration.setChecked(settings.value("shell_integration", "false") == "true")
+            self.paste_rate.setValue(int(settings.value("paste_rate", 0)))
+            self.bracketed_paste.setChecked(settings.value("bracketed_paste", "false") == "true")
+            self.keymap_overrides.setText(settings.value("keymap", ""))
+            self.use_agent.setChecked(settings.value("use_agent", "false") == "true")
+            self.transport_profile.setCurrentIndex(
+                max(0, self.transport_profile.findData(settings.value("transport_profile", "default"))))
             
             use_key = settings.value("use_key", "false") == "true"
             self.use_key.setChecked(use_key)
@@ -821,6 +1310,107 @@ class MainWindow(QMainWindow):
                 # 从列表中删除
                 self.session_list.takeItem(self.session_list.row(current))
     
+    def on_tab_changed(self, index):
+        """切换标签页：记录旧标签页的隐藏时间，恢复新标签页的输出"""
+        if self.current_tab is not None and hasattr(self.current_tab, 'scrollback'):
+            self.current_tab.scrollback.hidden_since = time.time()
+        
+        self.current_tab = self.content_widget.widget(index)
+        if hasattr(self.current_tab, 'restore_output'):
+            self.current_tab.restore_output()
+    
+    def hibernate_idle_tabs(self):
+        """压缩隐藏超过阈值的标签页的回滚内容"""
+        now = time.time()
+        for i in range(self.content_widget.count()):
+            tab = self.content_widget.widget(i)
+            if (tab is not self.content_widget.currentWidget() and hasattr(tab, 'scrollback')
+                    and not tab.scrollback.hibernated
+                    and tab.scrollback.idle_for(now) > self.hibernate_after):
+                tab.hibernate_output()
+    
+    def session_connect_args(self, name):
+        """读取已保存会话，生成 SSHClient.connect 的参数"""
+        settings = QSettings("SSH客户端", "连接")
+        settings.beginGroup(name)
+        username = settings.value("username", "")
+        args = {'hostname': settings.value("hostname", ""),
+                'port': int(settings.value("port", 22)),
+                'username': username,
+                'jump_hosts': parse_jump_hosts(settings.value("jump_hosts", ""), username),
+                'use_agent': settings.value("use_agent", "false") == "true",
+                'transport_profile': settings.value("transport_profile", "default")}
+        if settings.value("use_key", "false") == "true":
+            args['key_file'] = settings.value("key_file", "")
+        else:
+            args['password'] = settings.value("password", "")
+        settings.endGroup()
+        return args
+    
+    def open_group_exec(self):
+        """打开批量执行窗口"""
+        names = [self.session_list.item(i).text() for i in range(self.session_list.count())]
+        selected = [item.text() for item in self.session_list.selectedItems()]
+        dialog = GroupExecDialog(self, names, selected)
+        dialog.show()
+    
+    def toggle_prewarm(self, checked):
+        """开关连接预热"""
+        QSettings("SSH客户端", "设置").setValue("prewarm", checked)
+        prewarmer.enabled = checked
+        if checked:
+            self.prewarm_frequent_sessions()
+    
+    def prewarm_session(self, item):
+        """预热会话列表中选中或悬停的会话"""
+        if not item or not prewarmer.enabled:
+            return
+        try:
+            prewarmer.warm(self.session_connect_args(item.text()))
+        except ValueError:
+            pass
+    
+    def prewarm_frequent_sessions(self, count=5):
+        """预先解析最常用会话的地址"""
+        if not prewarmer.enabled:
+            return
+        settings = QSettings("SSH客户端", "连接")
+        usage = sorted(settings.childGroups(),
+                       key=lambda name: int(settings.value(f"{name}/connect_count", 0)), reverse=True)
+        for name in usage[:count]:
+            try:
+                prewarmer.warm(self.session_connect_args(name), handshake=False)
+            except ValueError:
+                pass
+    
+    def user_bindings(self):
+        """读取用户自定义的快捷键（全局设置）"""
+        return parse_bindings(QSettings("SSH客户端", "设置").value("keymap", ""))
+    
+    def edit_keymap(self):
+        """编辑全局快捷键，新设置对之后打开的终端生效"""
+        try:
+            bindings = self.user_bindings()
+        except ValueError:
+            bindings = {}
+        help_text = "\n".join(f"{name}: {description}" for name, description in ACTIONS.items())
+        text, ok = QInputDialog.getMultiLineText(
+            self, "快捷键", f"每行一条“按键=动作”，可用动作:\n{help_text}",
+            format_bindings(Keymap(bindings).bindings))
+        if not ok:
+            return
+        try:
+            bindings = parse_bindings(text)
+        except ValueError as e:
+            QMessageBox.warning(self, "输入错误", str(e))
+            return
+        QSettings("SSH客户端", "设置").setValue("keymap", format_bindings(bindings))
+    
+    def forget_keys(self):
+        """清除已缓存的解密密钥，之后的连接需要重新读取密钥文件"""
+        key_cache.forget()
+        QMessageBox.information(self, "忘记密钥", "已清除内存中缓存的密钥")
+    
     def close_tab(self, index):
         """关闭标签页"""
         # 获取标签页
@@ -828,9 +1418,127 @@ class MainWindow(QMainWindow):
         
         # 关闭标签页
         self.content_widget.removeTab(index)
+        
+        # removeTab 不会删除页面：终端标签页需立即断开连接（停止端口转发、释放跳板机、
+        # 结束工作进程），并删除页面以触发 destroyed 上的清理；连接表单页仍被窗口引用，保留
+        ssh_client = getattr(tab, 'ssh_client', None)
+        if ssh_client is not None:
+            ssh_client.disconnect()
+            tab.deleteLater()
+
+class GroupExecDialog(QDialog):
+    """在一组已保存会话上并发执行非交互命令，结果到达即显示并合并相同输出"""
+    def __init__(self, main_window, names, selected=None):
+        super().__init__(main_window)
+        self.main_window = main_window
+        self.results = []
+        self.setWindowTitle("批量执行")
+        self.resize(900, 600)
+        self.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+        
+        layout = QVBoxLayout(self)
+        
+        # 会话选择
+        self.host_list = QListWidget()
+        for name in names:
+            item = QListWidgetItem(name)
+            item.setFlags(item.flags() | Qt.ItemFlag.ItemIsUserCheckable)
+            item.setCheckState(Qt.CheckState.Checked if name in (selected or []) else Qt.CheckState.Unchecked)
+            self.host_list.addItem(item)
+        layout.addWidget(self.host_list, 1)
+        
+        # 命令和并发数
+        command_layout = QHBoxLayout()
+        self.command = QLineEdit()
+        self.command.setPlaceholderText("要执行的命令，如 uptime")
+        self.concurrency = QSpinBox()
+        self.concurrency.setRange(1, 500)
+        self.concurrency.setValue(64)
+        self.run_btn = QPushButton("执行")
+        self.run_btn.clicked.connect(self.run)
+        command_layout.addWidget(QLabel("命令:"))
+        command_layout.addWidget(self.command, 1)
+        command_layout.addWidget(QLabel("并发:"))
+        command_layout.addWidget(self.concurrency)
+        command_layout.addWidget(self.run_btn)
+        layout.addLayout(command_layout)
+        
+        # 结果表格
+        self.table = QTableWidget(0, 5)
+        self.table.setHorizontalHeaderLabels(["会话", "退出码", "耗时(秒)", "标准输出", "标准错误"])
+        self.table.horizontalHeader().setStretchLastSection(True)
+        layout.addWidget(self.table, 2)
+        
+        # 分组摘要
+        self.summary = QTextEdit()
+        self.summary.setReadOnly(True)
+        self.summary.setFont(QFont("Courier New", 10))
+        layout.addWidget(self.summary, 1)
+    
+    def run(self):
+        """开始执行"""
+        command = self.command.text()
+        names = [self.host_list.item(i).text() for i in range(self.host_list.count())
+                 if self.host_list.item(i).checkState() == Qt.CheckState.Checked]
+        if not command or not names:
+            QMessageBox.warning(self, "输入错误", "请选择会话并输入命令")
+            return
+        
+        try:
+            targets = [(name, self.main_window.session_connect_args(name)) for name in names]
+        except ValueError as e:
+            QMessageBox.warning(self, "输入错误", str(e))
+            return
+        
+        self.results = []
+        self.table.setRowCount(0)
+        self.summary.clear()
+        self.run_btn.setEnabled(False)
+        
+        concurrency = self.concurrency.value()
+        task = BackgroundTask(lambda progress: run_group(targets, command, concurrency, progress=progress),
+                              parent=self)
+        task.progress.connect(self.add_result)
+        task.finished.connect(self.on_finished)
+        task.finished.connect(task.deleteLater)
+        task.start()
+    
+    def add_result(self, result):
+        """添加一台主机的结果并刷新摘要"""
+        self.results.append(result)
+        row = self.table.rowCount()
+        self.table.insertRow(row)
+        status = result.error if result.error else str(result.exit_status)
+        for column, text in enumerate([result.name, status, f"{result.elapsed:.2f}",
+                                       result.stdout.strip(), result.stderr.strip()]):
+            self.table.setItem(row, column, QTableWidgetItem(text))
+        self.summary.setPlainText(f"已完成 {len(self.results)} 台\n" + summarize(self.results))
+    
+    def on_finished(self, result):
+        self.run_btn.setEnabled(True)
+        if isinstance(result, Exception):
+            QMessageBox.critical(self, "批量执行失败", str(result))
 
 # 完全覆盖输入框的键盘事件处理
 class TerminalInput(QLineEdit):
+    # 字符模式下特殊按键对应的终端序列
+    RAW_KEY_SEQUENCES = {
+        Qt.Key.Key_Return: "\r",
+        Qt.Key.Key_Enter: "\r",
+        Qt.Key.Key_Backspace: "\x7f",
+        Qt.Key.Key_Tab: "\t",
+        Qt.Key.Key_Escape: "\x1b",
+        Qt.Key.Key_Up: "\x1b[A",
+        Qt.Key.Key_Down: "\x1b[B",
+        Qt.Key.Key_Right: "\x1b[C",
+        Qt.Key.Key_Left: "\x1b[D",
+        Qt.Key.Key_Home: "\x1b[H",
+        Qt.Key.Key_End: "\x1b[F",
+        Qt.Key.Key_Delete: "\x1b[3~",
+        Qt.Key.Key_PageUp: "\x1b[5~",
+        Qt.Key.Key_PageDown: "\x1b[6~",
+    }
+    
     def __init__(self, ssh_client, terminal_output=None, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.setObjectName("terminalInput")
@@ -843,10 +1551,134 @@ class TerminalInput(QLineEdit):
         self.tab_completion_active = False
         self.original_command = ""
         
+        # 字符模式：按键在短时间窗口内合并为一次发送，并进行预测式本地回显
+        self.raw_mode = False
+        self.pending_keys = ""
+        self.coalesce_ms = 10
+        self.coalesce_timer = QTimer(self)
+        self.coalesce_timer.setSingleShot(True)
+        self.coalesce_timer.timeout.connect(self.flush_keys)
+        self.echo_predictor = EchoPredictor()
+        self.echo_timer = QTimer(self)
+        self.echo_timer.timeout.connect(self.expire_predictions)
+        
+        # 流式粘贴设置
+        self.paste_rate = 0            # 字节/秒，0 表示不限速
+        self.bracketed_paste = False
+        self.paste_threshold = 1024    # 超过此长度或含换行的内容走流式粘贴
+        
         # 设置焦点策略
         self.setFocusPolicy(Qt.FocusPolicy.StrongFocus)
     
+    def set_raw_mode(self, enabled):
+        """切换字符模式"""
+        self.flush_keys()
+        self.raw_mode = enabled
+        self.ssh_client.raw_mode = enabled
+        self.clear()
+        if enabled:
+            self.echo_timer.start(250)
+        else:
+            self.echo_timer.stop()
+    
+    def queue_keys(self, data):
+        """缓存按键数据，合并窗口结束时统一发送"""
+        self.pending_keys += data
+        if not self.coalesce_timer.isActive():
+            self.coalesce_timer.start(self.coalesce_ms)
+    
+    def flush_keys(self):
+        """发送缓存的按键数据"""
+        self.coalesce_timer.stop()
+        if self.pending_keys:
+            self.ssh_client.send_keys(self.pending_keys)
+            self.pending_keys = ""
+    
+    def render_output(self, data):
+        """字符模式下渲染服务器输出，先与预测回显对齐"""
+        rollback, data = self.echo_predictor.reconcile(data)
+        self._rollback_output(rollback)
+        
+        # 换行统一为\n，单独的\r（行内重绘）忽略；退格由插入逻辑处理
+        data = data.replace('\r\n', '\n').replace('\r', '')
+        data = re.sub(r'[\x00-\x07\x0b-\x1f]', '', data)
+        if data:
+            self._insert_output(data)
+    
+    def expire_predictions(self):
+        """撤销超时未被服务器确认的预测回显"""
+        self._rollback_output(self.echo_predictor.expire())
+    
+    def _insert_output(self, text):
+        cursor = self.terminal_output.textCursor()
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        for part in re.split('(\x08)', text):
+            if part == '\x08':
+                cursor.deletePreviousChar()
+            elif part:
+                cursor.insertText(part)
+        self.terminal_output.setTextCursor(cursor)
+    
+    def _rollback_output(self, count):
+        if count <= 0:
+            return
+        cursor = self.terminal_output.textCursor()
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        cursor.movePosition(QTextCursor.MoveOperation.Left, QTextCursor.MoveMode.KeepAnchor, count)
+        cursor.removeSelectedText()
+        self.terminal_output.setTextCursor(cursor)
+    
+    def paste_text(self, text):
+        """在后台线程中分块发送粘贴内容，显示进度并可取消"""
+        if not text or not self.ssh_client.connected:
+            return
+        self.flush_keys()
+        
+        job = PasteJob(self.ssh_client.channel, text, rate=self.paste_rate, bracketed=self.bracketed_paste)
+        dialog = QProgressDialog("正在粘贴...", "取消", 0, job.total, self)
+        dialog.setWindowTitle("粘贴")
+        dialog.setMinimumDuration(500)
+        dialog.canceled.connect(job.cancel)
+        
+        def on_finished(result):
+            dialog.reset()
+            if isinstance(result, Exception) and self.terminal_output:
+                self.terminal_output.append(f"\n[错误] 粘贴失败: {str(result)}")
+        
+        task = BackgroundTask(lambda progress: job.run(progress), parent=self)
+        task.progress.connect(lambda value: dialog.setValue(value[0]))
+        task.finished.connect(on_finished)
+        task.finished.connect(task.deleteLater)
+        task.start()
+    
+    def raw_key_data(self, event):
+        """把按键事件转换为发送给远端的字符"""
+        modifiers = event.modifiers()
+        if modifiers & Qt.KeyboardModifier.ControlModifier and Qt.Key.Key_A <= event.key() <= Qt.Key.Key_Z:
+            return chr(event.key() - Qt.Key.Key_A + 1)
+        if event.key() in self.RAW_KEY_SEQUENCES:
+            return self.RAW_KEY_SEQUENCES[event.key()]
+        return event.text()
+    
     def keyPressEvent(self, event):
+        # 多行或大段粘贴走流式粘贴，避免一次性发送阻塞界面
+        if event.matches(QKeySequence.StandardKey.Paste):
+            text = QApplication.clipboard().text()
+            if self.raw_mode or '\n' in text or len(text) > self.paste_threshold:
+                self.paste_text(text)
+                return
+        
+        # 字符模式：所有按键直接发送到远端
+        if self.raw_mode:
+            data = self.raw_key_data(event)
+            if data:
+                if data.isprintable() and self.echo_predictor.predict(data):
+                    self._insert_output(data)
+                elif not data.isprintable():
+                    self.echo_predictor.suspend()
+                self.queue_keys(data)
+            return
+        
         # 只处理上下箭头历史命令
         if event.key() == Qt.Key.Key_Up:
             if self.command_history and self.history_index < len(self.command_history) - 1:
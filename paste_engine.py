@@ -0,0 +1,71 @@
+import threading
+import time
+
+BRACKETED_PASTE_START = '\x1b[200~'
+BRACKETED_PASTE_END = '\x1b[201~'
+
+
+class PasteJob:
+    """分块发送大段粘贴内容
+
+    在工作线程中运行：每块发送前等待通道发送窗口，不会阻塞界面线程；
+    可选括号粘贴模式和限速（适用于处理不过来的网络设备），随时可取消。
+    """
+    def __init__(self, channel, text, chunk_size=4096, rate=0, bracketed=False):
+        self.channel = channel
+        self.chunk_size = chunk_size
+        self.rate = rate                # 字节/秒，0 表示不限速
+        self.bracketed = bracketed
+        self.cancelled = threading.Event()
+
+        text = text.replace('\r\n', '\n')
+        if bracketed:
+            text = BRACKETED_PASTE_START + text + BRACKETED_PASTE_END
+        self.data = text.encode('utf-8')
+        self.total = len(self.data)
+
+    def cancel(self):
+        """取消粘贴（线程安全）"""
+        self.cancelled.set()
+
+    def run(self, progress=None):
+        """发送全部内容，返回已发送的字节数；progress 以 (已发送, 总数) 调用"""
+        sent = 0
+        start = time.monotonic()
+        while sent < self.total:
+            if self.cancelled.is_set():
+                closing = self._closing(sent) if self.bracketed and sent else b''
+                while closing:
+                    count = self.channel.send(closing)
+                    closing = closing[count if isinstance(count, int) else len(closing):]
+                break
+
+            # 等待通道发送窗口（没有 send_ready 的通道直接发送）
+            send_ready = getattr(self.channel, 'send_ready', None)
+            if send_ready and not send_ready():
+                if getattr(self.channel, 'closed', False):
+                    raise EOFError("通道已关闭")
+                self.cancelled.wait(0.01)
+                continue
+
+            chunk = self.data[sent:sent + self.chunk_size]
+            count = self.channel.send(chunk)
+            sent += count if isinstance(count, int) else len(chunk)
+            if progress:
+                progress((sent, self.total))
+
+            # 限速：按已发送量计算应到达的时间
+            if self.rate:
+                delay = start + sent / self.rate - time.monotonic()
+                if delay > 0:
+                    self.cancelled.wait(delay)
+        return sent
+
+    def _closing(self, sent):
+        """取消时需要补发的字节：补齐被截断的开始标记并发送完整的结束标记，
+        避免远端停留在粘贴状态或收到半个转义序列"""
+        end_start = self.total - len(BRACKETED_PASTE_END)
+        closing = self.data[max(sent, end_start):]
+        if sent < len(BRACKETED_PASTE_START):
+            closing = self.data[sent:len(BRACKETED_PASTE_START)] + closing
+        return closing
@@ -0,0 +1,385 @@
+import selectors
+import socket
+import struct
+import threading
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+RELAY_BUFFER_SIZE = 65536
+CHANNEL_OPEN_TIMEOUT = 10     # 打开转发通道的超时秒数（paramiko 默认为一小时）
+OPEN_WORKERS = 32             # 同时进行的通道打开数，目标不可达时也不会堵住新连接
+
+
+class ForwardSpec:
+    """单条端口转发规则及其流量计数
+
+    规则格式（与 ssh 命令行一致，绑定地址可省略）：
+        L:[bind_host:]bind_port:dest_host:dest_port   本地转发 (-L)
+        R:[bind_host:]bind_port:dest_host:dest_port   远程转发 (-R)
+        D:[bind_host:]bind_port                       动态SOCKS5转发 (-D)
+    """
+    def __init__(self, kind, bind_host, bind_port, dest_host=None, dest_port=None):
+        self.kind = kind
+        self.bind_host = bind_host
+        self.bind_port = bind_port
+        self.dest_host = dest_host
+        self.dest_port = dest_port
+
+        # 流量统计，由转发线程更新
+        self.bytes_in = 0           # 远端 -> 本地
+        self.bytes_out = 0          # 本地 -> 远端
+        self.active_connections = 0
+        self.total_connections = 0
+
+    @classmethod
+    def parse(cls, text):
+        """解析单条转发规则，格式错误时抛出 ValueError"""
+        parts = text.strip().split(':')
+        kind = parts[0].upper()
+        try:
+            if kind in ('L', 'R') and len(parts) in (4, 5):
+                bind_host = parts[1] if len(parts) == 5 else ('127.0.0.1' if kind == 'L' else '')
+                return cls(kind, bind_host, int(parts[-3]), parts[-2], int(parts[-1]))
+            if kind == 'D' and len(parts) in (2, 3):
+                bind_host = parts[1] if len(parts) == 3 else '127.0.0.1'
+                return cls(kind, bind_host, int(parts[-1]))
+        except ValueError:
+            pass
+        raise ValueError(f"无效的转发规则: {text}")
+
+    def __str__(self):
+        if self.kind == 'D':
+            return f"D:{self.bind_host}:{self.bind_port}"
+        return f"{self.kind}:{self.bind_host}:{self.bind_port}:{self.dest_host}:{self.dest_port}"
+
+
+def parse_forwards(text):
+    """解析逗号分隔的转发规则列表"""
+    return [ForwardSpec.parse(item) for item in text.split(',') if item.strip()]
+
+
+class _Tunnel:
+    """一条已建立的转发连接：本地socket <-> SSH通道"""
+    def __init__(self, sock, chan, forward):
+        self.sock = sock
+        self.chan = chan
+        self.forward = forward
+        self.to_chan = b''   # 等待写入通道的数据
+        self.to_sock = b''   # 等待写入socket的数据
+
+
+class _Socks5Handshake:
+    """SOCKS5握手状态（仅支持无认证的CONNECT命令）"""
+    def __init__(self, sock, forward):
+        self.sock = sock
+        self.forward = forward
+        self.buffer = b''
+        self.greeted = False
+
+    def feed(self, data):
+        """处理收到的数据，返回目标地址 (host, port)；数据不完整时返回 None"""
+        self.buffer += data
+        if not self.greeted:
+            if len(self.buffer) < 2 or len(self.buffer) < 2 + self.buffer[1]:
+                return None
+            if self.buffer[0] != 5:
+                raise ValueError("不支持的SOCKS版本")
+            self.buffer = self.buffer[2 + self.buffer[1]:]
+            self.greeted = True
+            self.sock.send(b'\x05\x00')
+
+        if len(self.buffer) < 5:
+            return None
+        ver, cmd, _, atyp = self.buffer[:4]
+        if ver != 5 or cmd != 1:
+            raise ValueError("仅支持SOCKS5 CONNECT")
+        if atyp == 1:
+            end = 4 + 4
+            host = socket.inet_ntoa(self.buffer[4:end]) if len(self.buffer) >= end else None
+        elif atyp == 3:
+            end = 5 + self.buffer[4]
+            host = self.buffer[5:end].decode('idna') if len(self.buffer) >= end else None
+        elif atyp == 4:
+            end = 4 + 16
+            host = socket.inet_ntop(socket.AF_INET6, self.buffer[4:end]) if len(self.buffer) >= end else None
+        else:
+            raise ValueError("不支持的地址类型")
+        if host is None or len(self.buffer) < end + 2:
+            return None
+        port = struct.unpack('>H', self.buffer[end:end + 2])[0]
+        return host, port
+
+
+class PortForwarder:
+    """基于单个selector线程的端口转发器
+
+    所有转发连接的数据中继都在同一个线程中完成，不为每条连接创建线程；
+    只有会阻塞的通道打开/远程连接建立交给线程池，并且都有超时，
+    个别不可达的目标不会长期占住线程池。
+    """
+    def __init__(self, transport):
+        self.transport = transport
+        self.forwards = []
+        self.selector = selectors.DefaultSelector()
+        self.running = False
+        self.thread = None
+        self.executor = ThreadPoolExecutor(max_workers=OPEN_WORKERS)
+
+        self._listeners = []
+        self._tunnels = set()
+        self._chan_backlog = set()    # 通道发送窗口已满、等待重试的连接
+        self._remote_ports = {}       # 远程转发：服务器端口 -> 规则
+        self._calls = queue.SimpleQueue()
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self.selector.register(self._wake_r, selectors.EVENT_READ, None)
+
+    def add(self, forward):
+        """添加一条转发规则，绑定失败时抛出异常"""
+        if forward.kind == 'R':
+            port = self.transport.request_port_forward(forward.bind_host, forward.bind_port,
+                                                       handler=self._on_remote_channel)
+            self._remote_ports[port] = forward
+        else:
+            listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            listener.bind((forward.bind_host, forward.bind_port))
+            listener.listen(128)
+            listener.setblocking(False)
+            self._listeners.append(listener)
+            self._call_soon(lambda: self.selector.register(listener, selectors.EVENT_READ, forward))
+        self.forwards.append(forward)
+
+    def start(self):
+        """启动转发线程"""
+        self.running = True
+        self.thread = threading.Thread(target=self._run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        """停止全部转发并关闭所有连接"""
+        self.running = False
+        self._wake()
+        if self.thread:
+            self.thread.join(timeout=2)
+        for forward in self.forwards:
+            if forward.kind == 'R':
+                try:
+                    self.transport.cancel_port_forward(forward.bind_host, forward.bind_port)
+                except Exception:
+                    pass
+        for listener in self._listeners:
+            listener.close()
+        for tunnel in list(self._tunnels):
+            self._close_tunnel(tunnel)
+        self.executor.shutdown(wait=False)
+        self.selector.close()
+        self._wake_r.close()
+        self._wake_w.close()
+
+    def stats(self):
+        """返回每条规则的流量统计文本"""
+        return [f"{forward}  连接: {forward.active_connections}/{forward.total_connections}  "
+                f"接收: {forward.bytes_in} 字节  发送: {forward.bytes_out} 字节"
+                for forward in self.forwards]
+
+    def _call_soon(self, func):
+        """在转发线程中执行函数（线程安全）"""
+        self._calls.put(func)
+        self._wake()
+
+    def _wake(self):
+        try:
+            self._wake_w.send(b'x')
+        except OSError:
+            pass
+
+    def _run(self):
+        while self.running:
+            # 有等待通道窗口的数据时缩短超时，以便及时重试发送
+            timeout = 0.01 if self._chan_backlog else 1.0
+            for key, mask in self.selector.select(timeout):
+                data = key.data
+                try:
+                    if data is None:
+                        self._drain_calls()
+                    elif isinstance(data, ForwardSpec):
+                        self._accept(key.fileobj, data)
+                    elif isinstance(data, _Socks5Handshake):
+                        self._socks_read(data)
+                    else:
+                        self._relay(data, key.fileobj, mask)
+                except Exception as e:
+                    print(f"端口转发错误: {str(e)}")
+                    if isinstance(data, _Tunnel):
+                        self._close_tunnel(data)
+                    elif isinstance(data, _Socks5Handshake):
+                        self._unregister(data.sock)
+                        data.sock.close()
+
+            for tunnel in list(self._chan_backlog):
+                self._flush(tunnel)
+
+    def _drain_calls(self):
+        try:
+            while self._wake_r.recv(4096):
+                pass
+        except BlockingIOError:
+            pass
+        while True:
+            try:
+                func = self._calls.get_nowait()
+            except queue.Empty:
+                return
+            func()
+
+    def _accept(self, listener, forward):
+        sock, peer = listener.accept()
+        sock.setblocking(False)
+        if forward.kind == 'D':
+            self.selector.register(sock, selectors.EVENT_READ, _Socks5Handshake(sock, forward))
+        else:
+            self.executor.submit(self._open_channel, sock, peer, forward,
+                                 (forward.dest_host, forward.dest_port), None)
+
+    def _socks_read(self, handshake):
+        data = handshake.sock.recv(4096)
+        if not data:
+            self._unregister(handshake.sock)
+            handshake.sock.close()
+            return
+        dest = handshake.feed(data)
+        if dest:
+            self._unregister(handshake.sock)
+            self.executor.submit(self._open_channel, handshake.sock, handshake.sock.getpeername(),
+                                 handshake.forward, dest, b'\x05\x00\x00\x01\x00\x00\x00\x00\x00\x00')
+
+    def _open_channel(self, sock, peer, forward, dest, reply):
+        """在线程池中打开 direct-tcpip 通道，完成后交回转发线程"""
+        try:
+            chan = self.transport.open_channel('direct-tcpip', dest, peer, timeout=CHANNEL_OPEN_TIMEOUT)
+        except Exception as e:
+            print(f"打开转发通道失败 {dest[0]}:{dest[1]}: {str(e)}")
+            if reply:
+                try:
+                    sock.send(b'\x05\x05' + reply[2:])
+                except OSError:
+                    pass
+            sock.close()
+            return
+        if reply:
+            sock.send(reply)
+        self._call_soon(lambda: self._add_tunnel(sock, chan, forward))
+
+    def _on_remote_channel(self, chan, origin, server):
+        """远程转发回调（在paramiko传输线程中调用）"""
+        forward = self._remote_ports.get(server[1])
+        if forward is None:
+            chan.close()
+            return
+        self.executor.submit(self._connect_local, chan, forward)
+
+    def _connect_local(self, chan, forward):
+        try:
+            sock = socket.create_connection((forward.dest_host, forward.dest_port), timeout=10)
+        except OSError as e:
+            print(f"远程转发连接本地失败 {forward.dest_host}:{forward.dest_port}: {str(e)}")
+            chan.close()
+            return
+        sock.setblocking(False)
+        self._call_soon(lambda: self._add_tunnel(sock, chan, forward))
+
+    def _add_tunnel(self, sock, chan, forward):
+        chan.setblocking(False)
+        tunnel = _Tunnel(sock, chan, forward)
+        self._tunnels.add(tunnel)
+        forward.active_connections += 1
+        forward.total_connections += 1
+        self._update_interest(tunnel)
+
+    def _relay(self, tunnel, fileobj, mask):
+        if fileobj is tunnel.sock:
+            if mask & selectors.EVENT_WRITE and tunnel.to_sock:
+                sent = tunnel.sock.send(tunnel.to_sock)
+                tunnel.to_sock = tunnel.to_sock[sent:]
+            if mask & selectors.EVENT_READ:
+                data = tunnel.sock.recv(RELAY_BUFFER_SIZE)
+                if not data:
+                    self._close_tunnel(tunnel)
+                    return
+                tunnel.to_chan += data
+                tunnel.forward.bytes_out += len(data)
+        else:
+            data = tunnel.chan.recv(RELAY_BUFFER_SIZE)
+            if not data:
+                self._close_tunnel(tunnel)
+                return
+            tunnel.to_sock += data
+            tunnel.forward.bytes_in += len(data)
+            try:
+                sent = tunnel.sock.send(tunnel.to_sock)
+                tunnel.to_sock = tunnel.to_sock[sent:]
+            except BlockingIOError:
+                pass
+        self._flush(tunnel)
+
+    def _flush(self, tunnel):
+        """在通道窗口允许时发送积压数据，并更新关注的事件"""
+        if tunnel not in self._tunnels:
+            self._chan_backlog.discard(tunnel)
+            return
+        if tunnel.to_chan and tunnel.chan.send_ready():
+            try:
+                sent = tunnel.chan.send(tunnel.to_chan)
+                tunnel.to_chan = tunnel.to_chan[sent:]
+            except socket.timeout:
+                pass
+            except Exception:
+                self._close_tunnel(tunnel)
+                return
+        self._update_interest(tunnel)
+
+    def _update_interest(self, tunnel):
+        """积压数据未发出前停止读取对端，实现逐连接的背压"""
+        sock_events = 0
+        if not tunnel.to_chan:
+            sock_events |= selectors.EVENT_READ
+        if tunnel.to_sock:
+            sock_events |= selectors.EVENT_WRITE
+        self._set_events(tunnel.sock, sock_events, tunnel)
+        self._set_events(tunnel.chan, 0 if tunnel.to_sock else selectors.EVENT_READ, tunnel)
+
+        if tunnel.to_chan:
+            self._chan_backlog.add(tunnel)
+        else:
+            self._chan_backlog.discard(tunnel)
+
+    def _set_events(self, fileobj, events, data):
+        try:
+            key = self.selector.get_key(fileobj)
+        except KeyError:
+            if events:
+                self.selector.register(fileobj, events, data)
+            return
+        if not events:
+            self.selector.unregister(fileobj)
+        elif key.events != events:
+            self.selector.modify(fileobj, events, data)
+
+    def _unregister(self, fileobj):
+        try:
+            self.selector.unregister(fileobj)
+        except (KeyError, ValueError):
+            pass
+
+    def _close_tunnel(self, tunnel):
+        if tunnel not in self._tunnels:
+            return
+        self._tunnels.discard(tunnel)
+        self._chan_backlog.discard(tunnel)
+        self._unregister(tunnel.sock)
+        self._unregister(tunnel.chan)
+        tunnel.sock.close()
+        tunnel.chan.close()
+        tunnel.forward.active_connections -= 1
@@ -0,0 +1,132 @@
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import paramiko
+
+from transport_profile import get_profile
+
+
+class DNSCache:
+    """带有效期的本地DNS缓存"""
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {}    # (主机, 端口) -> (地址列表, 解析时间)
+
+    def resolve(self, hostname, port):
+        """返回 getaddrinfo 结果，有效期内直接使用缓存"""
+        key = (hostname, port)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and now - entry[1] < self.ttl:
+                return entry[0]
+        addresses = socket.getaddrinfo(hostname, port, type=socket.SOCK_STREAM)
+        with self._lock:
+            self._entries[key] = (addresses, now)
+        return addresses
+
+    def connect(self, hostname, port, timeout=10):
+        """使用缓存的地址建立TCP连接，依次尝试每个地址
+
+        所有地址都连接失败时丢弃缓存，主机换了地址时下次重新解析。
+        """
+        last_error = None
+        for family, socktype, proto, _, address in self.resolve(hostname, port):
+            sock = socket.socket(family, socktype, proto)
+            sock.settimeout(timeout)
+            try:
+                sock.connect(address)
+                return sock
+            except OSError as e:
+                sock.close()
+                last_error = e
+        with self._lock:
+            self._entries.pop((hostname, port), None)
+        raise last_error or OSError(f"无法解析主机: {hostname}")
+
+
+class Prewarmer:
+    """连接预热：提前完成DNS解析、TCP连接和密钥交换
+
+    预热好的传输层在 idle_timeout 秒内未被使用即关闭；认证仍在真正连接时进行。
+    """
+    def __init__(self, idle_timeout=30):
+        self.idle_timeout = idle_timeout
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._ready = {}       # (主机, 端口, 传输配置) -> (Transport, 完成时间)
+        self._warming = set()
+        self._executor = ThreadPoolExecutor(max_workers=4)
+
+    def warm(self, connect_args, handshake=True):
+        """在后台预热会话连接；经跳板机的会话只预解析第一跳的地址"""
+        if not self.enabled:
+            return
+        jump_hosts = connect_args.get('jump_hosts')
+        if jump_hosts:
+            self._executor.submit(self._resolve_quietly, jump_hosts[0].hostname, jump_hosts[0].port)
+            return
+        if not handshake:
+            self._executor.submit(self._resolve_quietly, connect_args['hostname'], connect_args['port'])
+            return
+
+        key = (connect_args['hostname'], connect_args['port'],
+               get_profile(connect_args.get('transport_profile')).name)
+        with self._lock:
+            if key in self._warming or key in self._ready:
+                return
+            self._warming.add(key)
+        self._executor.submit(self._handshake, key)
+
+    def take(self, hostname, port, profile_name):
+        """取出已完成密钥交换的传输层，没有可用的时返回 None"""
+        with self._lock:
+            entry = self._ready.pop((hostname, port, profile_name), None)
+        if entry and entry[0].is_active() and time.time() - entry[1] < self.idle_timeout:
+            return entry[0]
+        if entry:
+            entry[0].close()
+        return None
+
+    def evict_idle(self):
+        """关闭超过空闲时间未被使用的预热连接"""
+        now = time.time()
+        with self._lock:
+            expired = [key for key, entry in self._ready.items()
+                       if now - entry[1] >= self.idle_timeout or not entry[0].is_active()]
+            transports = [self._ready.pop(key)[0] for key in expired]
+        for transport in transports:
+            transport.close()
+
+    def _resolve_quietly(self, hostname, port):
+        try:
+            dns_cache.resolve(hostname, port)
+        except OSError:
+            pass
+
+    def _handshake(self, key):
+        hostname, port, profile_name = key
+        transport = None
+        try:
+            kwargs = get_profile(profile_name).connect_kwargs()
+            sock = dns_cache.connect(hostname, port)
+            transport = paramiko.Transport(sock, disabled_algorithms=kwargs.get('disabled_algorithms'))
+            transport.use_compression(kwargs['compress'])
+            transport.start_client(timeout=10)
+            with self._lock:
+                self._ready[key] = (transport, time.time())
+        except Exception as e:
+            print(f"预热连接失败 {hostname}:{port}: {str(e)}")
+            if transport:
+                transport.close()
+        finally:
+            with self._lock:
+                self._warming.discard(key)
+
+
+# 全局共享的DNS缓存和连接预热器
+dns_cache = DNSCache()
+prewarmer = Prewarmer()
@@ -0,0 +1,377 @@
+import multiprocessing
+import pickle
+import struct
+import threading
+import time
+from collections import deque
+from multiprocessing import shared_memory
+
+from ssh_client import SSHClient
+from terminal_text import clean_output
+
+IN_FLIGHT_LIMIT = 32 * 1024   # 已交给工作进程但尚未发出的字节上限，低于管道缓冲区，发送不会阻塞
+
+
+class SharedRingBuffer:
+    """单生产者/单消费者的共享内存环形缓冲区
+
+    头部保存单调递增的写位置和读位置，数据区存放带4字节长度前缀的消息。
+    写位置只由生产者更新、读位置只由消费者更新，因此无需加锁。
+    超过容量一半的消息由 split 拆成多段，长度前缀的最高位表示后面还有分段，
+    read 时重新拼接，因此任意大小的消息都能写入。
+    """
+    HEADER = struct.Struct('QQ')
+    LENGTH = struct.Struct('I')
+    MORE = 1 << 31
+
+    def __init__(self, name=None, size=1 << 20):
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=self.HEADER.size + size)
+            self.HEADER.pack_into(self.shm.buf, 0, 0, 0)
+            self.owner = True
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            self.owner = False
+        self.name = self.shm.name
+        self.capacity = self.shm.size - self.HEADER.size
+        self._partial = b''     # 消费者：尚未收齐的分段消息
+
+    def split(self, data):
+        """把消息拆成可写入的分段，返回 [(分段, 后面是否还有分段)]"""
+        size = self.capacity // 2 - self.LENGTH.size
+        if len(data) <= size:
+            return [(data, False)]
+        return [(data[i:i + size], i + size < len(data)) for i in range(0, len(data), size)]
+
+    def write(self, data, more=False):
+        """写入一条消息（或 split 得到的一个分段），空间不足时返回 False"""
+        write_pos, read_pos = self.HEADER.unpack_from(self.shm.buf, 0)
+        record = self.LENGTH.pack(len(data) | (self.MORE if more else 0)) + data
+        if len(record) > self.capacity - (write_pos - read_pos):
+            return False
+        self._copy_in(write_pos, record)
+        # 数据写完后再推进写位置，消费者不会读到半条消息
+        struct.pack_into('Q', self.shm.buf, 0, write_pos + len(record))
+        return True
+
+    def read(self, max_items=None):
+        """读出已写入的消息列表"""
+        write_pos, read_pos = self.HEADER.unpack_from(self.shm.buf, 0)
+        messages = []
+        while read_pos < write_pos and (max_items is None or len(messages) < max_items):
+            length = self.LENGTH.unpack(self._copy_out(read_pos, self.LENGTH.size))[0]
+            more = length & self.MORE
+            length &= ~self.MORE
+            self._partial += self._copy_out(read_pos + self.LENGTH.size, length)
+            if not more:
+                messages.append(self._partial)
+                self._partial = b''
+            read_pos += self.LENGTH.size + length
+        struct.pack_into('Q', self.shm.buf, 8, read_pos)
+        return messages
+
+    def close(self):
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+    def _copy_in(self, pos, data):
+        start = pos % self.capacity
+        first = min(len(data), self.capacity - start)
+        base = self.HEADER.size
+        self.shm.buf[base + start:base + start + first] = data[:first]
+        if first < len(data):
+            self.shm.buf[base:base + len(data) - first] = data[first:]
+
+    def _copy_out(self, pos, length):
+        start = pos % self.capacity
+        first = min(length, self.capacity - start)
+        base = self.HEADER.size
+        data = bytes(self.shm.buf[base + start:base + start + first])
+        if first < length:
+            data += bytes(self.shm.buf[base:base + length - first])
+        return data
+
+
+def _pump_outgoing(client, outgoing, sent_bytes):
+    """按顺序把排队的数据和按键写入通道，通道窗口不足时立即返回，不阻塞主循环
+
+    outgoing 中的 bytes 为粘贴数据，(命令, 参数) 为排在其后的按键和命令，
+    保证粘贴过程中输入的内容不会插到粘贴数据前面。
+    """
+    while outgoing:
+        item = outgoing[0]
+        if isinstance(item, tuple):
+            outgoing.popleft()
+            getattr(client, item[0])(item[1])
+            continue
+        if not client.channel.send_ready():
+            return
+        count = client.channel.send(item)
+        sent_bytes.value += count
+        if count < len(item):
+            outgoing[0] = item[count:]
+        else:
+            outgoing.popleft()
+
+
+def _worker_main(connect_args, ring_name, conn, sent_bytes):
+    """工作进程：持有SSH连接，完成接收、解码和清理后写入共享内存
+
+    sent_bytes 为共享计数器，记录已写入SSH通道的字节数，界面进程据此实现发送背压。
+    """
+    client = SSHClient()
+    success, message = client.connect(**connect_args)
+    conn.send((success, message))
+    if not success:
+        return
+
+    ring = SharedRingBuffer(ring_name)
+    outbox = []
+    parts = []
+    outgoing = deque()
+    # 消息首字节区分类型：T 为可直接显示的文本，F 为快进合并后的整屏输出，M 为命令标记事件
+    client.start_receiving(lambda data, frame: outbox.append(
+        (b'F' if frame else b'T') + clean_output(data, client.raw_mode).encode()))
+    client.block_callback = lambda event: outbox.append(b'M' + pickle.dumps(event))
+
+    try:
+        while client.connected:
+            # 处理界面进程发来的命令
+            while conn.poll():
+                command, arg = conn.recv()
+                if command == 'disconnect':
+                    client.disconnect()
+                    break
+                elif command == 'interrupt':
+                    # 与终端收到 ^C 时清空输入队列一致，未发出的粘贴数据和按键一并丢弃；
+                    # 丢弃的字节计入已发送，界面进程的背压计数不会卡住
+                    sent_bytes.value += sum(len(item) for item in outgoing if isinstance(item, bytes))
+                    outgoing.clear()
+                    client.interrupt()
+                    outbox[:] = [message for message in outbox if message[:1] == b'M']
+                elif command == 'start_forwarding':
+                    conn.send(client.start_forwarding(arg))
+                elif command == 'send_bytes':
+                    # 不能用 sendall：远端回显占满共享内存时通道窗口不会再打开，
+                    # 阻塞在发送上就没人继续搬运输出，也收不到中断和断开命令
+                    outgoing.append(arg)
+                elif command in ('send_command', 'send_raw', 'send_keys'):
+                    outgoing.append((command, arg))
+                elif command in ('raw_mode', 'fast_forward'):
+                    setattr(client, command, arg)
+                else:
+                    getattr(client, command)(arg)
+
+            _pump_outgoing(client, outgoing, sent_bytes)
+
+            if not parts and not outbox and not client.process_pending():
+                time.sleep(0.01)
+                continue
+
+            # 共享内存写满时暂停取数据，背压一路传回SSH通道；
+            # 大消息分段写入，parts 为正在写入的消息剩余的分段（中断时不会被丢弃一半）
+            while parts or outbox:
+                if not parts:
+                    parts = ring.split(outbox.pop(0))
+                if not ring.write(*parts[0]):
+                    break
+                parts.pop(0)
+            if parts or outbox:
+                time.sleep(0.005)
+    except (EOFError, OSError):
+        client.disconnect()
+    finally:
+        ring.close()
+
+
+class _ChannelProxy:
+    """把对通道的直接发送转发给工作进程
+
+    send_ready 在工作进程积压的未发送数据超过 IN_FLIGHT_LIMIT 时返回 False，
+    SSH通道的窗口背压由此传到界面进程（如 PasteJob）。
+    """
+    def __init__(self, owner):
+        self.owner = owner
+
+    @property
+    def closed(self):
+        return not self.owner.connected
+
+    def send(self, data):
+        if isinstance(data, str):
+            data = data.encode()
+        self.owner._send_bytes(data)
+        return len(data)
+
+    def send_ready(self):
+        return self.owner.queued_bytes - self.owner.sent_bytes.value < IN_FLIGHT_LIMIT
+
+
+class ProcessSSHClient:
+    """在独立工作进程中运行的SSH客户端，接口与 SSHClient 一致
+
+    工作进程持有paramiko连接并完成解码与清理，界面进程只从共享内存
+    读取可直接显示的文本，繁忙会话的开销分散到多个CPU核心上。
+    """
+    pre_cleaned = True
+
+    def __init__(self, ring_size=1 << 20):
+        self.ring_size = ring_size
+        self.ring = None
+        self.process = None
+        self.conn = None
+        self.channel = None
+        self.connected = False
+        self.forwarder = None         # 转发在工作进程中运行，统计不可见
+        self.tab_completion = False
+        self.current_command = ""
+        self.output_callback = None
+        self.listeners = []           # 输出监听函数（在界面线程读取共享内存时调用）
+        self.block_callback = None
+        self._raw_mode = False
+        self._fast_forward = False
+        # 界面线程和后台粘贴线程都会发送命令，写管道需串行，避免消息交错
+        self.send_lock = threading.Lock()
+        self.queued_bytes = 0         # 已交给工作进程的待发送字节数
+        self.sent_bytes = None        # 工作进程已写入通道的字节数（共享计数器）
+
+    @property
+    def raw_mode(self):
+        return self._raw_mode
+
+    @raw_mode.setter
+    def raw_mode(self, enabled):
+        self._raw_mode = enabled
+        self._command('raw_mode', enabled)
+
+    @property
+    def fast_forward(self):
+        return self._fast_forward
+
+    @fast_forward.setter
+    def fast_forward(self, enabled):
+        self._fast_forward = enabled
+        self._command('fast_forward', enabled)
+
+    def connect(self, hostname, port, username, password=None, key_file=None, jump_hosts=None,
+                use_agent=False, transport_profile=None):
+        """启动工作进程并在其中建立SSH连接（密钥缓存和跳板机缓存属于各自的工作进程）"""
+        connect_args = {'hostname': hostname, 'port': port, 'username': username,
+                        'password': password, 'key_file': key_file, 'jump_hosts': jump_hosts,
+                        'use_agent': use_agent, 'transport_profile': transport_profile}
+        try:
+            self.ring = SharedRingBuffer(size=self.ring_size)
+            ctx = multiprocessing.get_context('spawn')
+            self.conn, child_conn = ctx.Pipe()
+            self.sent_bytes = ctx.Value('Q', 0)
+            self.process = ctx.Process(target=_worker_main,
+                                       args=(connect_args, self.ring.name, child_conn, self.sent_bytes))
+            self.process.daemon = True
+            self.process.start()
+
+            if not self.conn.poll(60):
+                raise TimeoutError("工作进程无响应")
+            success, message = self.conn.recv()
+        except Exception as e:
+            success, message = False, f"连接失败: {str(e)}"
+
+        if success:
+            self.channel = _ChannelProxy(self)
+            self.connected = True
+        else:
+            self._shutdown()
+        return success, message
+
+    def start_forwarding(self, forwards):
+        """在工作进程中启动端口转发，返回无法建立的规则及原因"""
+        if not forwards or not self.connected:
+            return []
+        self._command('start_forwarding', forwards)
+        if self.conn.poll(30):
+            return self.conn.recv()
+        return ["工作进程无响应"]
+
+    def disconnect(self):
+        """断开连接并结束工作进程"""
+        if self.connected:
+            self._command('disconnect', None)
+            self.connected = False
+        self._shutdown()
+        for listener in self.listeners:
+            listener('')
+
+    def add_listener(self, listener):
+        self.listeners = self.listeners + [listener]
+
+    def remove_listener(self, listener):
+        self.listeners = [l for l in self.listeners if l is not listener]
+
+    def send_command(self, command):
+        self._command('send_command', command)
+
+    def send_raw(self, command):
+        self._command('send_raw', command)
+
+    def send_keys(self, data):
+        self._command('send_keys', data)
+
+    def interrupt(self):
+        """中断命令并丢弃共享内存中尚未渲染的输出"""
+        self._command('interrupt', None)
+        self.discard_pending()
+
+    def start_receiving(self, callback):
+        self.output_callback = callback
+
+    def process_pending(self, max_items=64):
+        """在界面线程中读取工作进程已处理好的输出并回调"""
+        if not self.output_callback or not self.ring:
+            return 0
+        messages = self.ring.read(max_items)
+        for data in messages:
+            if data[:1] == b'M':
+                if self.block_callback:
+                    self.block_callback(pickle.loads(data[1:]))
+                continue
+            text = data[1:].decode('utf-8', errors='replace')
+            for listener in self.listeners:
+                listener(text)
+            self.output_callback(text, data[:1] == b'F')
+        return len(messages)
+
+    def discard_pending(self):
+        """丢弃共享内存中的输出，命令标记照常交付"""
+        chunks = []
+        if not self.ring:
+            return chunks
+        for data in self.ring.read():
+            if data[:1] == b'M':
+                if self.block_callback:
+                    self.block_callback(pickle.loads(data[1:]))
+            else:
+                chunks.append(data[1:].decode('utf-8', errors='replace'))
+        return chunks
+
+    def _send_bytes(self, data):
+        with self.send_lock:
+            self.queued_bytes += len(data)
+        self._command('send_bytes', data)
+
+    def _command(self, command, arg):
+        if self.connected and self.conn:
+            try:
+                with self.send_lock:
+                    self.conn.send((command, arg))
+            except (BrokenPipeError, OSError):
+                self.connected = False
+
+    def _shutdown(self):
+        if self.process:
+            self.process.join(timeout=2)
+            if self.process.is_alive():
+                self.process.terminate()
+            self.process = None
+        if self.ring:
+            self.ring.close()
+            self.ring = None
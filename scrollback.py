@@ -0,0 +1,99 @@
+import time
+import zlib
+from collections import deque
+
+# 优先使用zstd压缩（可选依赖），否则回退到zlib
+try:
+    import zstandard
+    _compress = zstandard.ZstdCompressor(level=3).compress
+    _decompress = zstandard.ZstdDecompressor().decompress
+except ImportError:
+    def _compress(data):
+        return zlib.compress(data, 6)
+    _decompress = zlib.decompress
+
+
+class TabBuffer:
+    """后台标签页的轻量输出模型
+
+    标签页隐藏时新输出只记录在这里，切换回来时一次性渲染；
+    长时间未查看的标签页把回滚内容压缩成块保存，需要时再展开。
+    """
+    BLOCK_SIZE = 256 * 1024
+
+    def __init__(self, max_pending=5000):
+        self.pending = deque()                     # 隐藏期间的输出 (是否字符模式, 文本或事件)
+        self.max_pending = max_pending             # 最多保留的文本条数（命令标记不计入）
+        self.text_count = 0
+        self.skipped = 0                           # 因超过上限丢弃的文本条数
+        self.skipped_lines = 0                     # 以及其中的行数
+        self.blocks = []                           # 压缩后的回滚内容
+        self.hibernated = False
+        self.hidden_since = None
+
+    def defer(self, text, raw=False):
+        """记录隐藏期间的输出（raw 为 None 时 text 为命令标记事件）
+
+        文本超过上限时丢弃最旧的文本并记录丢弃的行数；命令标记从不丢弃，
+        否则命令块的开始/结束无法配对。
+        """
+        self.pending.append((raw, text))
+        if raw is None:
+            return
+        self.text_count += 1
+        if self.text_count > self.max_pending:
+            self._drop_oldest_text()
+
+    def _drop_oldest_text(self):
+        for i, (raw, text) in enumerate(self.pending):
+            if raw is not None:
+                del self.pending[i]
+                self.text_count -= 1
+                self.skipped += 1
+                # 行模式下每条输出单独成行，字符模式下按换行计数
+                self.skipped_lines += text.count('\n') + (0 if raw else 1)
+                return
+
+    def take_pending(self):
+        """取出隐藏期间的输出，相邻的同类文本合并为一次渲染，命令标记保持原有顺序
+
+        有丢弃的输出时在最前面加一行提示。
+        """
+        entries = list(self.pending)
+        if self.skipped_lines:
+            entries.insert(0, (False, f"[后台] 已跳过 {self.skipped_lines} 行输出"))
+        elif self.skipped:
+            entries.insert(0, (False, "[后台] 已跳过部分输出"))
+        self.skipped = 0
+        self.skipped_lines = 0
+        self.text_count = 0
+
+        merged = []
+        for raw, text in entries:
+            if raw is not None and merged and merged[-1][0] == raw:
+                merged[-1][1].append(text)
+            else:
+                merged.append((raw, [text]))
+        self.pending.clear()
+        return [(raw, texts[0] if raw is None else ('' if raw else '\n').join(texts))
+                for raw, texts in merged]
+
+    def idle_for(self, now=None):
+        """标签页已隐藏的秒数，可见时为0"""
+        if self.hidden_since is None:
+            return 0
+        return (now or time.time()) - self.hidden_since
+
+    def compress(self, text):
+        """压缩保存回滚内容"""
+        data = text.encode('utf-8')
+        self.blocks = [_compress(data[i:i + self.BLOCK_SIZE])
+                       for i in range(0, len(data), self.BLOCK_SIZE)]
+        self.hibernated = True
+
+    def expand(self):
+        """展开压缩的回滚内容并释放压缩块"""
+        data = b''.join(_decompress(block) for block in self.blocks)
+        self.blocks = []
+        self.hibernated = False
+        return data.decode('utf-8', errors='replace')
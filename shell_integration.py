@@ -0,0 +1,112 @@
+import re
+import time
+
+# OSC 133 (FinalTerm) 标记：A 提示符开始，B 命令输入开始，C 命令输出开始，D;退出码 命令结束
+OSC133 = re.compile(r'\x1b\]133;([ABCD])(?:;([^\x07\x1b]*))?(?:\x07|\x1b\\)')
+OSC133_PREFIX = '\x1b]133;'
+MAX_PENDING = 64       # 标记最长不过十几个字符，超过此长度的未结束序列按普通文本交付
+
+# 自动注入的bash提示符钩子，命令以空格开头以免进入历史记录。
+# PS0 从 bash 4.4 起才支持，更早的版本收不到 C 标记，命令输出会被当作命令回显，
+# 因此只在 4.4 及以上版本注入，其余情况保持未激活，由调用方按提示符字符判断
+BASH_HOOK = (r""" case "$BASH_VERSION" in 4.[4-9]*|[5-9].*|[1-9][0-9]*) """
+             r"""PS0=$'\e]133;C\a'; PS1='\[\e]133;D;$?\a\e]133;A\a\]'"$PS1"'\[\e]133;B\a\]';; esac""")
+
+
+class CommandBlock:
+    """一条命令及其输出的记录"""
+    def __init__(self, index, command):
+        self.index = index
+        self.command = command
+        self.exit_code = None
+        self.start_time = time.time()
+        self.end_time = None
+        self.byte_count = 0
+        # 以下由界面记录：输出在终端中的起止行号和折叠状态
+        self.first_line = None
+        self.last_line = None
+        self.collapsed = False
+
+    def duration(self):
+        if self.end_time is None:
+            return None
+        return self.end_time - self.start_time
+
+
+class CommandSegmenter:
+    """按 OSC 133 标记把输出流切分为提示符、命令和命令输出
+
+    feed 返回事件列表：
+        ('text', 文本)            命令输出或无法归类的输出
+        ('prompt_text', 文本)     提示符
+        ('command_text', 文本)    命令回显
+        ('prompt', None)          新提示符出现
+        ('start', CommandBlock)   命令开始输出
+        ('end', CommandBlock)     命令结束（含退出码）
+    收到第一个标记前 active 为 False，调用方应退回原有的提示符判断。
+    """
+    def __init__(self):
+        self.active = False
+        self.state = 'output'
+        self.current = None
+        self.command_text = ""
+        self.count = 0
+        self.pending = ""      # 被数据块边界截断的标记
+
+    def feed(self, data):
+        data = self.pending + data
+        self.pending = ""
+
+        # 末尾可能是被截断的标记，留到下次拼接；过长的未结束序列不是标记，直接交付
+        tail_start = data.rfind('\x1b')
+        if tail_start != -1 and len(data) - tail_start <= MAX_PENDING:
+            tail = data[tail_start:]
+            if OSC133_PREFIX.startswith(tail) or (tail.startswith(OSC133_PREFIX) and '\x07' not in tail):
+                self.pending = tail
+                data = data[:tail_start]
+
+        events = []
+        pos = 0
+        for match in OSC133.finditer(data):
+            self._text(data[pos:match.start()], events)
+            self._mark(match.group(1), match.group(2), events)
+            pos = match.end()
+        self._text(data[pos:], events)
+        return events
+
+    def _text(self, text, events):
+        if not text:
+            return
+        if self.state == 'prompt':
+            events.append(('prompt_text', text))
+        elif self.state == 'command':
+            self.command_text += text
+            events.append(('command_text', text))
+        else:
+            if self.current:
+                self.current.byte_count += len(text.encode('utf-8'))
+            events.append(('text', text))
+
+    def _mark(self, mark, param, events):
+        self.active = True
+        if mark == 'A':
+            self.state = 'prompt'
+            events.append(('prompt', None))
+        elif mark == 'B':
+            self.state = 'command'
+            self.command_text = ""
+        elif mark == 'C':
+            self.state = 'output'
+            self.current = CommandBlock(self.count, self.command_text.strip())
+            self.count += 1
+            events.append(('start', self.current))
+        elif mark == 'D':
+            self.state = 'output'
+            if self.current:
+                try:
+                    self.current.exit_code = int(param)
+                except (TypeError, ValueError):
+                    pass
+                self.current.end_time = time.time()
+                events.append(('end', self.current))
+                self.current = None
@@ -1,36 +1,216 @@
 import paramiko
 import threading
+import queue
 import time
 import re
 
+from port_forward import CHANNEL_OPEN_TIMEOUT, PortForwarder
+from jump_host import jump_cache
+from key_cache import key_cache
+from transport_profile import get_profile
+from shell_integration import CommandSegmenter
+from prewarm import dns_cache, prewarmer
+
+MAX_BUFFERED = 32 * 1024   # 行模式下未换行输出的缓冲上限，超过即交付，保证背压和内存有界
+
+
+def fast_forward_frames(items, max_lines):
+    """把积压的渲染队列合并为快进帧
+
+    items 为按顺序排列的文本和命令标记；相邻文本合并为一帧，所有文本总共只保留
+    最后 max_lines 行，命令标记保持在原来的位置，这样记录的命令行号与显示一致。
+    有跳过的行时在第一段保留的文本前注明。
+    """
+    runs = []
+    for data in items:
+        if isinstance(data, str) and runs and isinstance(runs[-1], str):
+            runs[-1] += data
+        else:
+            runs.append(data)
+
+    # 从后往前分配保留的行数
+    budget = max_lines
+    skipped = 0
+    frames = []
+    for data in reversed(runs):
+        if isinstance(data, str):
+            lines = data.split('\n')
+            kept = lines[-budget:] if budget > 0 else []
+            skipped += len(lines) - len(kept)
+            budget -= len(kept)
+            if not kept:
+                continue
+            data = '\n'.join(kept)
+        frames.append(data)
+    frames.reverse()
+
+    if skipped > 0:
+        notice = f"[快进] 已跳过 {skipped} 行输出"
+        for i, data in enumerate(frames):
+            if isinstance(data, str):
+                frames[i] = notice + '\n' + data
+                break
+        else:
+            frames.append(notice)
+    return frames
+
+
 class SSHClient:
+    pre_cleaned = False  # 输出是否已由工作进程清理（见 ProcessSSHClient）
+    
     def __init__(self):
         self.client = paramiko.SSHClient()
         self.client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        self.transport = None         # 当前连接的传输层（可能来自预热连接，不一定属于 self.client）
         self.channel = None
         self.connected = False
         self.tab_completion = False  # 标记是否正在进行Tab补全
         self.current_command = ""    # 当前命令
+        self.raw_mode = False        # 字符模式：按键直接发送，输出不再按行缓冲
+        
+        # 输出流控：接收线程与界面之间的有界渲染队列
+        self.output_queue = queue.Queue(maxsize=256)
+        self.output_callback = None
+        self.fast_forward = False     # 快进模式：积压时丢弃中间输出，只渲染最后若干行
+        self.fast_forward_lines = 200
+        
+        self.forwarder = None         # 端口转发器（有转发规则时创建）
+        self.jump_lease = []          # 当前连接对共享跳板机连接的租约
+        self.listeners = []           # 输出监听函数（在接收线程中调用，如脚本的 expect）
+        self.listener_lock = threading.Lock()
+        
+        # Shell集成：按 OSC 133 标记切分命令，标记事件经渲染队列交给 block_callback
+        self.segmenter = CommandSegmenter()
+        self.block_callback = None
         
-    def connect(self, hostname, port, username, password=None, key_file=None):
-        """建立SSH连接"""
+    def connect(self, hostname, port, username, password=None, key_file=None, jump_hosts=None,
+                use_agent=False, transport_profile=None, shell=True):
+        """建立SSH连接，指定跳板链时经跳板机的 direct-tcpip 通道连接目标
+
+        使用密钥文件时 password 作为密钥口令；密钥经 key_cache 缓存，
+        重复连接不再读取和解密密钥文件。transport_profile 为传输配置名，
+        shell 为 False 时只建立连接、不打开交互式终端。
+        """
+        profile = get_profile(transport_profile)
         try:
+            # 未指定密钥文件时保留 paramiko 的默认行为（ssh-agent 和 ~/.ssh 下的默认密钥），
+            # 已保存的依赖这些方式登录的会话不受影响；use_agent 使指定密钥时也尝试 ssh-agent
+            auth = {'allow_agent': use_agent or not key_file, 'look_for_keys': not key_file}
             if key_file:
-                self.client.connect(hostname, port=port, username=username, key_filename=key_file)
-            else:
-                self.client.connect(hostname, port=port, username=username, password=password)
-                
-            self.channel = self.client.invoke_shell()
+                auth['pkey'] = key_cache.load(key_file, password)
+            elif password:
+                auth['password'] = password
+            
+            if jump_hosts:
+                # 跳板机只用公钥认证，会话密码不会发给跳板机
+                transport, self.jump_lease = jump_cache.acquire(jump_hosts, auth.get('pkey'))
+                sock = transport.open_channel('direct-tcpip', (hostname, port), ('127.0.0.1', 0),
+                                              timeout=CHANNEL_OPEN_TIMEOUT)
+                self.client.connect(hostname, port=port, username=username, sock=sock,
+                                    **auth, **profile.connect_kwargs())
+            elif not self._connect_prewarmed(hostname, port, username, auth, profile):
+                # 开启预热时使用本地DNS缓存建立TCP连接，否则由 paramiko 每次重新解析
+                sock = dns_cache.connect(hostname, port) if prewarmer.enabled else None
+                self.client.connect(hostname, port=port, username=username, sock=sock,
+                                    **auth, **profile.connect_kwargs())
+            if self.transport is None:
+                self.transport = self.client.get_transport()
+            profile.apply(self.transport)
+            
+            if shell:
+                # 与 paramiko.SSHClient.invoke_shell 相同，但直接使用传输层
+                self.channel = self.transport.open_session(window_size=profile.shell_window_size())
+                self.channel.get_pty()
+                self.channel.invoke_shell()
             self.connected = True
             return True, "连接成功"
         except Exception as e:
+            self._close_transport()
+            self._release_jump_hosts()
             return False, f"连接失败: {str(e)}"
     
+    def _connect_prewarmed(self, hostname, port, username, auth, profile):
+        """使用已完成密钥交换的预热连接，只需认证；没有可用的预热连接时返回 False"""
+        transport = prewarmer.take(hostname, port, profile.name)
+        if transport is None:
+            return False
+        
+        try:
+            authenticated = self._auth_prewarmed(transport, username, auth)
+        except paramiko.AuthenticationException:
+            # 凭据被拒绝：不再用同样的密码重新连接，避免一次输错记为两次登录失败
+            transport.close()
+            raise
+        except Exception as e:
+            print(f"预热连接认证出错，改为重新连接: {str(e)}")
+            transport.close()
+            return False
+        
+        if not authenticated:
+            transport.close()
+            if auth.get('look_for_keys'):
+                return False    # 交给完整连接流程尝试 ~/.ssh 下的默认密钥
+            raise paramiko.AuthenticationException("认证失败")
+        self.transport = transport
+        return True
+    
+    def _auth_prewarmed(self, transport, username, auth):
+        """依次尝试会话密钥、ssh-agent 中的密钥和密码，返回是否认证成功
+
+        密码被拒绝时抛出 AuthenticationException。
+        """
+        keys = [auth['pkey']] if auth.get('pkey') else []
+        if auth.get('allow_agent'):
+            keys += paramiko.Agent().get_keys()
+        for key in keys:
+            try:
+                transport.auth_publickey(username, key)
+                return True
+            except paramiko.SSHException:
+                continue
+        if auth.get('password'):
+            transport.auth_password(username, auth['password'])
+            return True
+        return False
+    
+    def _close_transport(self):
+        """关闭当前传输层（预热连接不属于 self.client，需要单独关闭）"""
+        if self.transport is not None:
+            self.transport.close()
+            self.transport = None
+    
+    def _release_jump_hosts(self):
+        """释放对共享跳板机连接的引用"""
+        if self.jump_lease:
+            jump_cache.release(self.jump_lease)
+            self.jump_lease = []
+    
+    def start_forwarding(self, forwards):
+        """按规则启动端口转发，返回无法建立的规则及原因"""
+        errors = []
+        if not forwards or not self.connected:
+            return errors
+        
+        self.forwarder = PortForwarder(self.transport)
+        for forward in forwards:
+            try:
+                self.forwarder.add(forward)
+            except Exception as e:
+                errors.append(f"{forward}: {str(e)}")
+        self.forwarder.start()
+        return errors
+    
     def disconnect(self):
         """断开SSH连接"""
         if self.connected:
-            self.channel.close()
+            if self.forwarder:
+                self.forwarder.stop()
+                self.forwarder = None
+            if self.channel:
+                self.channel.close()
             self.client.close()
+            self._close_transport()
+            self._release_jump_hosts()
             self.connected = False
     
     def send_command(self, command):
@@ -39,7 +219,13 @@ class SSHClient:
             self.channel.send(command + '\n')
     
     def start_receiving(self, callback):
-        """启动接收数据的线程"""
+        """启动接收数据的线程
+
+        接收线程只负责把数据放入渲染队列，回调由界面线程通过 process_pending 触发。
+        队列满时接收线程停止读取通道，由SSH窗口背压让服务器减速。
+        """
+        self.output_callback = callback
+        
         def receive_data():
             buffer = ""
             last_data_time = 0
@@ -49,19 +235,40 @@ class SSHClient:
                         # 接收数据
                         data = self.channel.recv(1024).decode('utf-8', errors='replace')
                         last_data_time = time.time()
+                        # 只检查新收到的部分（多留一个字符以识别跨数据块的 ']#'），避免反复扫描整个缓冲
+                        scan_from = max(len(buffer) - 1, 0)
                         
-                        # 处理数据中的特殊字符
-                        data = data.replace('\x07', '')  # 删除响铃
-                        data = data.replace('\x1b[K', '') # 删除清除行
-                        data = re.sub(r'\x1b\[\d*[A-Za-z]', '', data)  # 删除ANSI转义序列
-                        
-                        # 缓冲数据
-                        buffer += data
+                        for kind, value in self.segmenter.feed(data):
+                            if kind in ('prompt', 'start', 'end'):
+                                # 命令边界：先交付之前的输出，再交付标记
+                                self._deliver(buffer)
+                                buffer = ""
+                                scan_from = 0
+                                self._enqueue((kind, value))
+                                if kind in ('prompt', 'start'):
+                                    self.tab_completion = False  # 新提示符或命令开始执行，补全结束
+                                continue
+                            
+                            # 处理数据中的特殊字符
+                            value = value.replace('\x07', '')  # 删除响铃
+                            value = value.replace('\x1b[K', '') # 删除清除行
+                            value = re.sub(r'\x1b\[\d*[A-Za-z]', '', value)  # 删除ANSI转义序列
+                            
+                            # 通知输出监听者（包括提示符）
+                            self._notify_listeners(value)
+                            
+                            # 行模式下提示符和命令回显由界面自行显示；
+                            # 但Tab补全的候选列表和补全的字符出现在命令输入区间内，补全期间需要交付
+                            if kind == 'text' or self.raw_mode or (kind == 'command_text' and self.tab_completion):
+                                buffer += value
                         
                         # 如果有完整的行或提示符，处理数据
-                        if '\n' in buffer or ']#' in buffer or '$' in buffer:
-                            if buffer.strip():
-                                callback(buffer)
+                        # 字符模式下立即交付，保证回显及时；启用Shell集成后不再按提示符字符猜测；
+                        # 没有换行的连续输出（如 base64 -w0）达到上限也交付，否则缓冲会无限增长
+                        received = buffer[scan_from:]
+                        prompt_seen = not self.segmenter.active and (']#' in received or '$' in received)
+                        if self.raw_mode or '\n' in received or prompt_seen or len(buffer) >= MAX_BUFFERED:
+                            self._deliver(buffer)
                             buffer = ""
                             
                     except Exception as e:
@@ -70,25 +277,130 @@ class SSHClient:
                 else:
                     # 如果超过50ms没有新数据，且有未处理的数据，则处理它
                     if buffer and time.time() - last_data_time > 0.05:
-                        if buffer.strip():
-                            callback(buffer)
+                        self._deliver(buffer)
                         buffer = ""
                     time.sleep(0.01)
             
             # 处理剩余的缓冲数据
             if buffer:
-                callback(buffer)
+                try:
+                    self.output_queue.put_nowait(buffer)
+                except queue.Full:
+                    pass
+            
+            # 唤醒仍在等待输出的监听者
+            self._notify_listeners('')
         
         thread = threading.Thread(target=receive_data)
         thread.daemon = True
         thread.start()
 
+    def add_listener(self, listener):
+        """添加输出监听函数，每收到一段数据调用一次，断开时以空字符串调用"""
+        with self.listener_lock:
+            self.listeners = self.listeners + [listener]
+
+    def remove_listener(self, listener):
+        """移除输出监听函数"""
+        with self.listener_lock:
+            self.listeners = [l for l in self.listeners if l is not listener]
+
+    def _notify_listeners(self, data):
+        for listener in self.listeners:
+            try:
+                listener(data)
+            except Exception as e:
+                print(f"输出监听错误: {str(e)}")
+
+    def _deliver(self, buffer):
+        """交付缓冲的输出：行模式下忽略纯空白，字符模式下空格和换行也是回显，必须交付"""
+        if buffer.strip() or (self.raw_mode and buffer):
+            self._enqueue(buffer)
+
+    def _enqueue(self, data):
+        """放入渲染队列，队列满时阻塞直到界面追上或连接断开"""
+        while self.connected:
+            try:
+                self.output_queue.put(data, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def process_pending(self, max_items=64):
+        """在界面线程中取出待渲染数据并回调，返回处理的条数
+
+        回调以 output_callback(文本, frame) 调用，frame 为 True 表示快进合并后的整屏输出。
+        """
+        if not self.output_callback:
+            return 0
+        
+        # 快进模式：积压超过一帧的量时合并全部积压，只保留最后若干行
+        if self.fast_forward and self.output_queue.qsize() > max_items:
+            items = self._drain()
+            for data in fast_forward_frames(items, self.fast_forward_lines):
+                # 快进帧是多条输出合并的结果，以 frame=True 交付，界面不再按提示符字符过滤
+                if isinstance(data, str):
+                    self.output_callback(data, True)
+                elif self.block_callback:
+                    self.block_callback(data)
+            return len(items)
+        
+        count = 0
+        while count < max_items:
+            try:
+                data = self.output_queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(data, str):
+                self.output_callback(data, False)
+            elif self.block_callback:
+                self.block_callback(data)
+            count += 1
+        return count
+
+    def discard_pending(self):
+        """丢弃渲染队列中的输出，返回被丢弃的文本；命令标记直接交付，不会丢失"""
+        chunks = []
+        for data in self._drain():
+            if isinstance(data, str):
+                chunks.append(data)
+            elif self.block_callback:
+                self.block_callback(data)
+        return chunks
+
+    def _drain(self):
+        """按顺序取出渲染队列中的全部内容"""
+        items = []
+        while True:
+            try:
+                items.append(self.output_queue.get_nowait())
+            except queue.Empty:
+                return items
+
+    def interrupt(self):
+        """发送Ctrl+C并丢弃尚未渲染的积压输出，使中断立即生效"""
+        if self.connected and self.channel:
+            try:
+                self.channel.send(b'\x03')
+            except Exception as e:
+                print(f"发送命令错误: {str(e)}")
+            self.discard_pending()
+
+    def send_keys(self, data):
+        """字符模式下发送合并后的按键数据"""
+        if self.connected and self.channel:
+            try:
+                self.channel.send(data.encode())
+            except Exception as e:
+                print(f"发送命令错误: {str(e)}")
+
     def send_raw(self, command):
         """发送原始命令，包括特殊字符"""
         if self.connected and self.channel:
             try:
                 if command == "\t":
-                    # 发送两个Tab字符来显示所有可能的补全选项
+                    # 发送两个Tab字符来显示所有可能的补全选项；补全结果在新提示符前交付给界面
+                    self.tab_completion = True
                     self.channel.send(b'\t\t')
                     time.sleep(0.1)  # 等待响应
                 else:
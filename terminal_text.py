@@ -0,0 +1,37 @@
+import re
+
+# 行模式下需要删除的控制字符
+CONTROL_CHARS = ['\x07', '\x08', '\x0b', '\x0c', '\x0e', '\x0f', '\x10',
+                 '\x11', '\x12', '\x13', '\x14', '\x15', '\x16', '\x17',
+                 '\x18', '\x19', '\x1a', '\x1c', '\x1d', '\x1e', '\x1f']
+
+
+def strip_escapes(data):
+    """删除颜色、清除行和光标移动等CSI转义序列"""
+    data = re.sub(r'\x1b\[\d+(?:;\d+)*[mK]', '', data)
+    return re.sub(r'\x1b\[\d*[ABCDEFGHJKST]', '', data)
+
+
+def strip_osc(data):
+    """删除OSC序列（窗口标题等）"""
+    return re.sub(r'\x1b\][^\a]*(?:\a|\x1b\\)', '', data)
+
+
+def clean_line_output(data):
+    """行模式显示前的完整清理：控制字符、换行符和OSC序列"""
+    for char in CONTROL_CHARS:
+        data = data.replace(char, '')
+    
+    # 换行符处理
+    data = data.replace('\r\n', '\n')
+    data = data.replace('\r', '\n')
+    
+    return strip_osc(data)
+
+
+def clean_output(data, raw_mode=False):
+    """按显示模式完成全部清理（字符模式保留退格等由渲染处理的字符）"""
+    data = strip_escapes(data)
+    if raw_mode:
+        return strip_osc(data)
+    return clean_line_output(data)
@@ -0,0 +1,33 @@
+"""测试共用的替身对象"""
+import time
+
+
+class FakeChannel:
+    """按顺序返回预设数据的通道"""
+    def __init__(self, chunks):
+        self.chunks = [chunk.encode() for chunk in chunks]
+        self.sent = b''
+
+    def recv_ready(self):
+        return bool(self.chunks)
+
+    def recv(self, size):
+        return self.chunks.pop(0)
+
+    def send(self, data):
+        self.sent += data
+
+    def close(self):
+        pass
+
+
+def receive_all(client, chunks, count):
+    """运行接收线程直到渲染队列中有 count 条内容"""
+    client.channel = FakeChannel(chunks)
+    client.connected = True
+    client.start_receiving(lambda data, frame: None)
+    deadline = time.time() + 2
+    while client.output_queue.qsize() < count and time.time() < deadline:
+        time.sleep(0.01)
+    client.connected = False
+    return client._drain()
@@ -0,0 +1,93 @@
+import threading
+import time
+
+import pytest
+
+from expect import ExpectSession, ExpectTimeout
+
+
+class FakeClient:
+    """只提供 ExpectSession 用到的监听和发送接口"""
+    def __init__(self):
+        self.connected = True
+        self.listeners = []
+        self.sent = ""
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        self.listeners.remove(listener)
+
+    def send_keys(self, data):
+        self.sent += data
+
+    def output(self, data, delay=0):
+        """模拟接收线程：稍后把数据交给监听者"""
+        def deliver():
+            time.sleep(delay)
+            for listener in list(self.listeners):
+                listener(data)
+        threading.Thread(target=deliver, daemon=True).start()
+
+    def disconnect(self, delay=0):
+        def close():
+            time.sleep(delay)
+            self.connected = False
+            for listener in list(self.listeners):
+                listener('')
+        threading.Thread(target=close, daemon=True).start()
+
+
+@pytest.fixture
+def client():
+    return FakeClient()
+
+
+def test_expect_wakes_on_new_output(client):
+    session = ExpectSession(client)
+    client.output("login ok\nuser$ ", delay=0.05)
+    match = session.expect(r'[$#] $', timeout=2)
+    assert match.group() == "$ "
+    assert session.buffer == ""
+
+
+def test_earliest_match_wins(client):
+    session = ExpectSession(client)
+    client.output("Password: ... user$ ")
+    index, match = session.expect_any([r'[$#] $', r'[Pp]assword:'], timeout=2)
+    assert index == 1
+    assert session.buffer == " ... user$ "
+
+
+def test_timeout(client):
+    session = ExpectSession(client)
+    with pytest.raises(ExpectTimeout):
+        session.expect("never", timeout=0.05)
+
+
+def test_no_timeout_waits_for_output(client):
+    session = ExpectSession(client)
+    client.output("done\n", delay=0.1)
+    assert session.expect("done", timeout=None)
+
+
+def test_disconnect_raises_eof(client):
+    session = ExpectSession(client)
+    client.disconnect(delay=0.05)
+    with pytest.raises(EOFError):
+        session.expect("never", timeout=None)
+
+
+def test_sendline_and_close(client):
+    session = ExpectSession(client)
+    session.sendline("uptime")
+    assert client.sent == "uptime\n"
+    session.close()
+    assert client.listeners == []
+
+
+def test_buffer_is_bounded(client):
+    session = ExpectSession(client, max_buffer=10)
+    session._on_data("x" * 25)
+    assert len(session.buffer) == 10
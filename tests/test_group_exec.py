@@ -0,0 +1,46 @@
+import pytest
+
+pytest.importorskip("paramiko")
+
+from group_exec import HostResult, aggregate, summarize
+
+
+def test_identical_output_is_grouped_largest_first():
+    results = [
+        HostResult("web3", stdout="ok\n", exit_status=0),
+        HostResult("db1", stdout="disk full\n", exit_status=1),
+        HostResult("web1", stdout="ok\n", exit_status=0),
+        HostResult("web2", stdout="ok\n", exit_status=0),
+    ]
+    groups = aggregate(results)
+    assert [names for _, names in groups] == [["web1", "web2", "web3"], ["db1"]]
+    assert groups[0][0].stdout == "ok\n"
+
+
+def test_exit_status_and_stderr_split_groups():
+    results = [
+        HostResult("a", stdout="x", exit_status=0),
+        HostResult("b", stdout="x", exit_status=2),
+        HostResult("c", stdout="x", stderr="warn", exit_status=0),
+    ]
+    assert len(aggregate(results)) == 3
+
+
+def test_summarize_error_and_exit_code_rows():
+    results = [
+        HostResult("a", stdout="up 3 days\n", exit_status=0),
+        HostResult("b", stdout="up 3 days\n", exit_status=0),
+        HostResult("c", error="认证失败"),
+    ]
+    assert summarize(results).split('\n') == [
+        "2 台主机: 退出码 0  [a, b]",
+        "    up 3 days",
+        "1 台主机: 失败 (认证失败)  [c]",
+    ]
+
+
+def test_summarize_truncates_long_host_lists():
+    results = [HostResult(f"h{i:02}", exit_status=0) for i in range(12)]
+    line = summarize(results)
+    assert line.startswith("12 台主机: 退出码 0  [h00, h01")
+    assert line.endswith("h09 ...]")
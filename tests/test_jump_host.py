@@ -0,0 +1,86 @@
+import pytest
+
+pytest.importorskip("paramiko")
+
+import jump_host
+from jump_host import JumpHost, TransportCache, parse_jump_hosts
+
+
+class FakeTransport:
+    def __init__(self):
+        self.active = True
+
+    def is_active(self):
+        return self.active
+
+
+class FakeClient:
+    """代替 paramiko.SSHClient，只记录连接参数和关闭状态"""
+    def __init__(self):
+        self.transport = FakeTransport()
+        self.auth = None
+
+    def set_missing_host_key_policy(self, policy):
+        pass
+
+    def connect(self, hostname, port=22, username=None, sock=None, **auth):
+        self.auth = auth
+
+    def get_transport(self):
+        return self.transport
+
+    def close(self):
+        self.transport.active = False
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    monkeypatch.setattr(jump_host.paramiko, 'SSHClient', FakeClient)
+    return TransportCache()
+
+
+def test_parse_jump_host_defaults():
+    hop = JumpHost.parse("bastion", default_user="alice")
+    assert hop.key() == ("alice", "bastion", 22)
+
+
+def test_parse_jump_host_chain():
+    chain = parse_jump_hosts("ops@gw:2222, inner", default_user="alice")
+    assert [str(hop) for hop in chain] == ["ops@gw:2222", "alice@inner:22"]
+
+
+@pytest.mark.parametrize("text", ["gw:port", "@:22", ":22"])
+def test_parse_invalid_jump_host(text):
+    with pytest.raises(ValueError):
+        JumpHost.parse(text)
+
+
+def test_shared_hop_closes_after_last_release(cache):
+    chain = parse_jump_hosts("gw")
+    transport, first = cache.acquire(chain)
+    same, second = cache.acquire(chain)
+    assert same is transport
+    cache.release(first)
+    assert transport.is_active()
+    cache.release(second)
+    assert not transport.is_active()
+
+
+def test_stale_lease_does_not_close_replacement(cache):
+    chain = parse_jump_hosts("gw")
+    stale, old_lease = cache.acquire(chain)
+    stale.active = False                     # 跳板机连接断开
+    fresh, new_lease = cache.acquire(chain)
+    assert fresh is not stale
+
+    cache.release(old_lease)
+    assert fresh.is_active()
+    cache.release(new_lease)
+    assert not fresh.is_active()
+
+
+def test_hops_never_receive_password(cache):
+    transport, lease = cache.acquire(parse_jump_hosts("gw"))
+    client = lease[0][1].client
+    assert 'password' not in client.auth
+    assert client.auth['allow_agent'] and client.auth['look_for_keys']
@@ -0,0 +1,72 @@
+import os
+
+import pytest
+
+pytest.importorskip("paramiko")
+
+import key_cache
+from key_cache import KeyCache
+
+
+@pytest.fixture
+def loads(monkeypatch):
+    """记录每次真正读取密钥文件的调用"""
+    calls = []
+
+    def fake_load(path, passphrase=None):
+        calls.append((path, passphrase))
+        return object()
+
+    monkeypatch.setattr(key_cache, '_load_key_file', fake_load)
+    return calls
+
+
+@pytest.fixture
+def key_file(tmp_path):
+    path = tmp_path / "id_test"
+    path.write_text("key")
+    return str(path)
+
+
+def test_cache_hit_reuses_key(loads, key_file):
+    cache = KeyCache()
+    first = cache.load(key_file, "secret")
+    assert cache.load(key_file, "secret") is first
+    assert len(loads) == 1
+
+
+def test_changed_file_is_reloaded(loads, key_file):
+    cache = KeyCache()
+    first = cache.load(key_file)
+    stat = os.stat(key_file)
+    os.utime(key_file, (stat.st_atime, stat.st_mtime + 10))
+    assert cache.load(key_file) is not first
+    assert len(loads) == 2
+
+
+def test_unused_key_expires(loads, key_file, monkeypatch):
+    cache = KeyCache(timeout=60)
+    now = [1000.0]
+    monkeypatch.setattr(key_cache.time, 'time', lambda: now[0])
+    cache.load(key_file)
+    now[0] += 30
+    cache.load(key_file)          # 使用会刷新有效期
+    now[0] += 59
+    cache.load(key_file)
+    assert len(loads) == 1
+    now[0] += 61
+    cache.load(key_file)
+    assert len(loads) == 2
+
+
+def test_forget_clears_cache(loads, key_file):
+    cache = KeyCache()
+    cache.load(key_file)
+    cache.forget()
+    cache.load(key_file)
+    assert len(loads) == 2
+
+
+def test_empty_passphrase_treated_as_none(loads, key_file):
+    KeyCache().load(key_file, "")
+    assert loads[0][1] is None
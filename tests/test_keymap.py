@@ -0,0 +1,46 @@
+import pytest
+
+pytest.importorskip("PyQt6.QtGui")
+
+from PyQt6.QtCore import QEvent, Qt
+from PyQt6.QtGui import QKeyEvent
+
+from keymap import DEFAULT_BINDINGS, Keymap, format_bindings, parse_bindings
+
+Mod = Qt.KeyboardModifier
+
+
+def press(key, modifiers=Mod.NoModifier):
+    return QKeyEvent(QEvent.Type.KeyPress, key, modifiers)
+
+
+def test_default_bindings():
+    keymap = Keymap()
+    assert keymap.lookup(press(Qt.Key.Key_Tab)) == 'complete'
+    assert keymap.lookup(press(Qt.Key.Key_C, Mod.ControlModifier)) == 'interrupt'
+    assert keymap.lookup(press(Qt.Key.Key_V, Mod.ControlModifier | Mod.ShiftModifier)) == 'paste'
+    assert keymap.lookup(press(Qt.Key.Key_C)) is None
+
+
+def test_later_layers_override_and_unbind():
+    keymap = Keymap({'F5': 'interrupt'}, {'Ctrl+C': 'none', 'F5': 'clear'})
+    assert keymap.lookup(press(Qt.Key.Key_F5)) == 'clear'
+    assert keymap.lookup(press(Qt.Key.Key_C, Mod.ControlModifier)) is None
+
+
+def test_keypad_modifier_ignored():
+    keymap = Keymap()
+    event = press(Qt.Key.Key_Up, Mod.ControlModifier | Mod.KeypadModifier)
+    assert keymap.lookup(event) == 'previous_command'
+
+
+def test_parse_and_format_round_trip():
+    bindings = parse_bindings("F5=interrupt; Ctrl+L = clear\n\n")
+    assert bindings == {'F5': 'interrupt', 'Ctrl+L': 'clear'}
+    assert parse_bindings(format_bindings(DEFAULT_BINDINGS)) == DEFAULT_BINDINGS
+
+
+@pytest.mark.parametrize("text", ["F5", "F5=explode", "=clear"])
+def test_parse_invalid_bindings(text):
+    with pytest.raises(ValueError):
+        parse_bindings(text)
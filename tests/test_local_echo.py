@@ -0,0 +1,65 @@
+import pytest
+
+from local_echo import EchoPredictor
+
+
+def test_confirmed_prediction_renders_nothing_twice():
+    predictor = EchoPredictor()
+    assert predictor.predict("ls")
+    assert predictor.reconcile("l") == (0, "")
+    assert predictor.reconcile("s") == (0, "")
+    assert predictor.pending == ""
+
+
+def test_whitespace_echo_keeps_predictions_aligned():
+    predictor = EchoPredictor()
+    predictor.predict("ls -l")
+    for echo in ("ls", " ", "-l"):
+        assert predictor.reconcile(echo) == (0, "")
+    assert not predictor.suspended
+
+
+def test_missing_echo_rolls_back_and_suspends():
+    predictor = EchoPredictor()
+    predictor.predict("ls -l")
+    predictor.reconcile("ls")
+    assert predictor.reconcile("-l") == (3, "-l")
+    assert predictor.suspended
+    assert not predictor.predict("x")
+
+
+def test_extra_output_after_confirmation():
+    predictor = EchoPredictor()
+    predictor.predict("a")
+    assert predictor.reconcile("a\r\nout") == (0, "\r\nout")
+
+
+def test_suspended_until_server_output_arrives():
+    predictor = EchoPredictor()
+    predictor.suspend()
+    assert not predictor.predict("a")
+    assert predictor.reconcile("prompt$ ") == (0, "prompt$ ")
+    assert predictor.predict("a")
+
+
+def test_expire_rolls_back_unconfirmed_prediction():
+    predictor = EchoPredictor(timeout=0)
+    predictor.predict("secret")
+    predictor.pending_since -= 1
+    assert predictor.expire() == 6
+    assert predictor.suspended
+
+
+def test_raw_mode_delivers_whitespace_only_chunks():
+    pytest.importorskip("paramiko")
+    from ssh_client import SSHClient
+
+    client = SSHClient()
+    client.connected = True
+    client._deliver(" ")
+    assert client.output_queue.empty()
+
+    client.raw_mode = True
+    client._deliver(" ")
+    client._deliver("\r\n")
+    assert client._drain() == [" ", "\r\n"]
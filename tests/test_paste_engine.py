@@ -0,0 +1,101 @@
+import threading
+import time
+
+import pytest
+
+from paste_engine import BRACKETED_PASTE_END, BRACKETED_PASTE_START, PasteJob
+
+
+class PasteChannel:
+    """记录每次发送的通道，每次最多接收 limit 字节"""
+    def __init__(self, limit=None):
+        self.limit = limit
+        self.chunks = []
+        self.ready = True
+        self.closed = False
+
+    def send_ready(self):
+        return self.ready
+
+    def send(self, data):
+        data = data[:self.limit] if self.limit else data
+        self.chunks.append(data)
+        return len(data)
+
+    @property
+    def sent(self):
+        return b''.join(self.chunks)
+
+
+def test_sends_in_chunks_and_normalizes_newlines():
+    channel = PasteChannel()
+    progress = []
+    job = PasteJob(channel, "ab\r\ncd\nef", chunk_size=3)
+    assert job.run(progress.append) == 8
+    assert channel.chunks == [b'ab\n', b'cd\n', b'ef']
+    assert progress[-1] == (8, 8)
+
+
+def test_partial_send_resumes_at_returned_count():
+    channel = PasteChannel(limit=2)
+    assert PasteJob(channel, "abcdefg", chunk_size=5).run() == 7
+    assert channel.sent == b'abcdefg'
+    assert channel.chunks[:2] == [b'ab', b'cd']
+
+
+def test_waits_while_channel_not_ready():
+    channel = PasteChannel()
+    channel.ready = False
+    job = PasteJob(channel, "data")
+    thread = threading.Thread(target=job.run)
+    thread.start()
+    time.sleep(0.05)
+    assert channel.chunks == []
+    channel.ready = True
+    thread.join(2)
+    assert channel.sent == b'data'
+
+
+def test_closed_channel_raises():
+    channel = PasteChannel()
+    channel.ready = False
+    channel.closed = True
+    with pytest.raises(EOFError):
+        PasteJob(channel, "data").run()
+
+
+def test_rate_limit_spaces_chunks():
+    channel = PasteChannel()
+    start = time.monotonic()
+    PasteJob(channel, "x" * 40, chunk_size=10, rate=400).run()
+    # 40 字节按 400 字节/秒发送，最后一块之后需等待约 0.1 秒
+    assert time.monotonic() - start >= 0.09
+
+
+def test_cancel_mid_paste_sends_bracketed_end():
+    channel = PasteChannel()
+    job = PasteJob(channel, "x" * 100, chunk_size=10, bracketed=True)
+    job.run(lambda progress: progress[0] >= 30 and job.cancel())
+    assert channel.sent == BRACKETED_PASTE_START.encode() + b'x' * 24 + BRACKETED_PASTE_END.encode()
+
+
+def test_cancel_inside_start_marker_completes_both_markers():
+    channel = PasteChannel(limit=3)
+    job = PasteJob(channel, "payload", bracketed=True)
+    job.run(lambda progress: job.cancel())
+    assert channel.sent == (BRACKETED_PASTE_START + BRACKETED_PASTE_END).encode()
+
+
+def test_cancel_inside_end_marker_finishes_it_once():
+    channel = PasteChannel()
+    job = PasteJob(channel, "ab", chunk_size=len(BRACKETED_PASTE_START) + 4, bracketed=True)
+    job.run(lambda progress: job.cancel())
+    assert channel.sent == job.data
+
+
+def test_cancel_before_start_sends_nothing():
+    channel = PasteChannel()
+    job = PasteJob(channel, "data", bracketed=True)
+    job.cancel()
+    assert job.run() == 0
+    assert channel.chunks == []
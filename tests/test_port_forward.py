@@ -0,0 +1,32 @@
+import pytest
+
+from port_forward import ForwardSpec, parse_forwards
+
+
+def test_parse_local_forward_default_bind_host():
+    forward = ForwardSpec.parse("L:8080:db.internal:5432")
+    assert (forward.kind, forward.bind_host, forward.bind_port) == ('L', '127.0.0.1', 8080)
+    assert (forward.dest_host, forward.dest_port) == ('db.internal', 5432)
+
+
+def test_parse_remote_forward_binds_all_by_default():
+    forward = ForwardSpec.parse("r:9000:localhost:3000")
+    assert forward.kind == 'R'
+    assert forward.bind_host == ''
+
+
+def test_parse_dynamic_forward_with_bind_host():
+    forward = ForwardSpec.parse("D:0.0.0.0:1080")
+    assert (forward.kind, forward.bind_host, forward.bind_port) == ('D', '0.0.0.0', 1080)
+    assert str(forward) == "D:0.0.0.0:1080"
+
+
+def test_parse_forwards_list_skips_empty_items():
+    forwards = parse_forwards("L:8080:host:80, ,D:1080,")
+    assert [str(f) for f in forwards] == ["L:127.0.0.1:8080:host:80", "D:127.0.0.1:1080"]
+
+
+@pytest.mark.parametrize("text", ["X:1:2:3", "L:8080:host", "L:abc:host:80", "D:1:2:3"])
+def test_parse_invalid_forward(text):
+    with pytest.raises(ValueError):
+        ForwardSpec.parse(text)
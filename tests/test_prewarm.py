@@ -0,0 +1,122 @@
+import socket
+
+import pytest
+
+pytest.importorskip("paramiko")
+
+import prewarm
+from prewarm import DNSCache, Prewarmer
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+class FakeTransport:
+    def __init__(self, active=True):
+        self.active = active
+        self.closed = False
+
+    def is_active(self):
+        return self.active and not self.closed
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(prewarm.time, 'time', clock.time)
+    return clock
+
+
+@pytest.fixture
+def lookups(monkeypatch):
+    calls = []
+
+    def getaddrinfo(hostname, port, type=0):
+        calls.append((hostname, port))
+        return [(socket.AF_INET, socket.SOCK_STREAM, 0, '', ('127.0.0.1', port))]
+    monkeypatch.setattr(prewarm.socket, 'getaddrinfo', getaddrinfo)
+    return calls
+
+
+def test_dns_cache_reuses_until_ttl(clock, lookups):
+    cache = DNSCache(ttl=300)
+    cache.resolve('web', 22)
+    clock.now += 299
+    cache.resolve('web', 22)
+    assert len(lookups) == 1
+    clock.now += 1
+    cache.resolve('web', 22)
+    assert len(lookups) == 2
+
+
+def test_dns_cache_keys_by_port(clock, lookups):
+    cache = DNSCache()
+    cache.resolve('web', 22)
+    cache.resolve('web', 2222)
+    assert lookups == [('web', 22), ('web', 2222)]
+
+
+def test_failed_connect_drops_cached_addresses(clock, lookups, monkeypatch):
+    class RefusingSocket:
+        def __init__(self, *args):
+            pass
+
+        def settimeout(self, timeout):
+            pass
+
+        def connect(self, address):
+            raise ConnectionRefusedError(address)
+
+        def close(self):
+            pass
+    monkeypatch.setattr(prewarm.socket, 'socket', RefusingSocket)
+
+    cache = DNSCache()
+    with pytest.raises(ConnectionRefusedError):
+        cache.connect('web', 22)
+    cache.resolve('web', 22)
+    assert len(lookups) == 2
+
+
+def test_take_returns_fresh_transport_once(clock):
+    warmer = Prewarmer(idle_timeout=30)
+    transport = FakeTransport()
+    warmer._ready[('web', 22, 'default')] = (transport, clock.now)
+    clock.now += 29
+    assert warmer.take('web', 22, 'default') is transport
+    assert warmer.take('web', 22, 'default') is None
+    assert not transport.closed
+
+
+def test_take_closes_expired_or_dead_transport(clock):
+    warmer = Prewarmer(idle_timeout=30)
+    stale, dead = FakeTransport(), FakeTransport(active=False)
+    warmer._ready[('web', 22, 'default')] = (stale, clock.now - 30)
+    warmer._ready[('db', 22, 'default')] = (dead, clock.now)
+    assert warmer.take('web', 22, 'default') is None
+    assert warmer.take('db', 22, 'default') is None
+    assert stale.closed and dead.closed
+
+
+def test_evict_idle_keeps_recent_transports(clock):
+    warmer = Prewarmer(idle_timeout=30)
+    old, recent = FakeTransport(), FakeTransport()
+    warmer._ready[('old', 22, 'default')] = (old, clock.now - 31)
+    warmer._ready[('new', 22, 'default')] = (recent, clock.now - 5)
+    warmer.evict_idle()
+    assert old.closed and not recent.closed
+    assert list(warmer._ready) == [('new', 22, 'default')]
+
+
+def test_warm_does_nothing_when_disabled():
+    warmer = Prewarmer()
+    warmer.warm({'hostname': 'web', 'port': 22})
+    assert not warmer._warming and not warmer._ready
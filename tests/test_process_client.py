@@ -0,0 +1,123 @@
+import pytest
+
+pytest.importorskip("paramiko")
+
+from collections import deque
+
+from process_client import SharedRingBuffer, _pump_outgoing
+
+
+@pytest.fixture
+def ring():
+    ring = SharedRingBuffer(size=64)
+    yield ring
+    ring.close()
+
+
+def test_messages_read_in_order(ring):
+    assert ring.write(b'one')
+    assert ring.write(b'two')
+    assert ring.read() == [b'one', b'two']
+    assert ring.read() == []
+
+
+def test_full_ring_rejects_write_until_read(ring):
+    # 共享内存大小可能按页取整，以实际容量为准；每条消息另有4字节长度前缀
+    fill = b'x' * (ring.capacity - SharedRingBuffer.LENGTH.size)
+    assert ring.write(fill)
+    assert not ring.write(b'y')
+    assert ring.read() == [fill]
+    assert ring.write(b'y')
+
+
+def test_wraparound_preserves_messages(ring):
+    # 反复写读使写位置越过缓冲区末尾，消息和长度前缀都会被拆成两段
+    for i in range(ring.capacity // 4):
+        message = bytes([i % 256]) * (7 + i % 13)
+        assert ring.write(message)
+        assert ring.read() == [message]
+
+
+def test_read_limit(ring):
+    for message in (b'a', b'b', b'c'):
+        ring.write(message)
+    assert ring.read(max_items=2) == [b'a', b'b']
+    assert ring.read() == [b'c']
+
+
+def test_consumer_attaches_by_name(ring):
+    consumer = SharedRingBuffer(ring.name)
+    try:
+        ring.write(b'hello')
+        assert consumer.read() == [b'hello']
+    finally:
+        consumer.close()
+
+
+def test_oversized_message_is_split_and_reassembled(ring):
+    message = bytes(range(256)) * (ring.capacity // 64 + 1)
+    assert len(message) > ring.capacity
+    parts = ring.split(message)
+    assert len(parts) > 2 and not parts[-1][1]
+
+    received = []
+    for part in parts:
+        while not ring.write(*part):
+            received += ring.read()
+    received += ring.read()
+    assert received == [message]
+
+
+def test_fragments_count_as_one_item(ring):
+    big = b'z' * ring.capacity
+    for part in ring.split(big)[:-1]:
+        assert ring.write(*part)
+        assert ring.read(max_items=1) == []
+    assert ring.write(*ring.split(big)[-1])
+    assert ring.write(b'next')
+    assert ring.read(max_items=1) == [big]
+    assert ring.read() == [b'next']
+
+
+class WindowChannel:
+    """按通道窗口大小接收数据的通道，窗口为 0 时 send_ready 返回 False"""
+    def __init__(self, window):
+        self.window = window
+        self.sent = b''
+
+    def send_ready(self):
+        return self.window > 0
+
+    def send(self, data):
+        count = min(self.window, len(data))
+        self.sent += data[:count]
+        self.window -= count
+        return count
+
+
+class Counter:
+    value = 0
+
+
+class KeyClient:
+    def __init__(self, channel):
+        self.channel = channel
+
+    def send_keys(self, data):
+        self.channel.sent += b'<' + data.encode() + b'>'
+
+
+def test_pump_returns_instead_of_blocking_on_full_window():
+    client, sent = KeyClient(WindowChannel(3)), Counter()
+    outgoing = deque([b'hello', ('send_keys', 'q')])
+    _pump_outgoing(client, outgoing, sent)
+    assert client.channel.sent == b'hel'
+    assert sent.value == 3
+    assert list(outgoing) == [b'lo', ('send_keys', 'q')]
+
+    # 窗口重新打开后剩余数据先发出，之后才是粘贴期间输入的按键
+    client.channel.window = 10
+    _pump_outgoing(client, outgoing, sent)
+    assert client.channel.sent == b'hello<q>'
+    assert sent.value == 5
+    assert not outgoing
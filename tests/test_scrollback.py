@@ -0,0 +1,58 @@
+from scrollback import TabBuffer
+
+
+def test_take_pending_merges_adjacent_text():
+    buffer = TabBuffer()
+    buffer.defer("a")
+    buffer.defer("b")
+    buffer.defer("x", raw=True)
+    buffer.defer("y", raw=True)
+    assert buffer.take_pending() == [(False, "a\nb"), (True, "xy")]
+    assert buffer.take_pending() == []
+
+
+def test_markers_keep_their_position():
+    buffer = TabBuffer()
+    buffer.defer("before")
+    buffer.defer(('start', 1), None)
+    buffer.defer("after")
+    assert buffer.take_pending() == [(False, "before"), (None, ('start', 1)), (False, "after")]
+
+
+def test_pending_is_bounded_with_notice():
+    buffer = TabBuffer(max_pending=3)
+    for i in range(5):
+        buffer.defer(str(i), raw=True)
+    assert buffer.take_pending() == [(False, "[后台] 已跳过部分输出"), (True, "234")]
+    buffer = TabBuffer(max_pending=3)
+    for i in range(5):
+        buffer.defer(f"line {i}")
+    assert buffer.take_pending() == [(False, "[后台] 已跳过 2 行输出\nline 2\nline 3\nline 4")]
+    assert buffer.take_pending() == []
+
+
+def test_markers_are_never_dropped():
+    buffer = TabBuffer(max_pending=2)
+    buffer.defer(('start', 1), None)
+    for i in range(4):
+        buffer.defer(f"out {i}")
+    buffer.defer(('end', 1), None)
+    assert buffer.take_pending() == [(False, "[后台] 已跳过 2 行输出"), (None, ('start', 1)),
+                                     (False, "out 2\nout 3"), (None, ('end', 1))]
+
+
+def test_compress_round_trip():
+    buffer = TabBuffer()
+    buffer.BLOCK_SIZE = 1000
+    text = "输出行\n" * 2000
+    buffer.compress(text)
+    assert buffer.hibernated and len(buffer.blocks) > 1
+    assert buffer.expand() == text
+    assert not buffer.hibernated and buffer.blocks == []
+
+
+def test_idle_for():
+    buffer = TabBuffer()
+    assert buffer.idle_for() == 0
+    buffer.hidden_since = 100
+    assert buffer.idle_for(now=160) == 60
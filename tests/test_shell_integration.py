@@ -0,0 +1,130 @@
+import pytest
+
+from fakes import FakeChannel, receive_all
+from shell_integration import CommandSegmenter
+
+A, B, C = '\x1b]133;A\x07', '\x1b]133;B\x07', '\x1b]133;C\x07'
+
+
+def D(code):
+    return f'\x1b]133;D;{code}\x07'
+
+
+def kinds(events):
+    return [kind for kind, _ in events]
+
+
+def test_inactive_until_first_marker():
+    segmenter = CommandSegmenter()
+    assert segmenter.feed("plain $ output") == [('text', "plain $ output")]
+    assert not segmenter.active
+
+
+def test_command_lifecycle():
+    segmenter = CommandSegmenter()
+    events = segmenter.feed(f"{A}user$ {B}ls\r\n{C}file1\r\n{D(0)}{A}user$ {B}")
+    assert kinds(events) == ['prompt', 'prompt_text', 'command_text', 'start', 'text', 'end',
+                             'prompt', 'prompt_text']
+    block = events[3][1]
+    assert block.command == "ls"
+    assert block.exit_code == 0
+    assert block.byte_count == len("file1\r\n")
+    assert block.duration() is not None
+
+
+def test_marker_split_across_chunks():
+    segmenter = CommandSegmenter()
+    data = f"{A}$ {B}false\r\n{C}{D(1)}"
+    events = []
+    for i in range(0, len(data), 3):
+        events += segmenter.feed(data[i:i + 3])
+    assert [kind for kind in kinds(events) if kind in ('prompt', 'start', 'end')] == ['prompt', 'start', 'end']
+    assert ''.join(value for kind, value in events if kind == 'command_text') == "false\r\n"
+    assert events[-1][1].exit_code == 1
+    assert segmenter.pending == ""
+
+
+def test_terminator_st_variant():
+    segmenter = CommandSegmenter()
+    events = segmenter.feed("\x1b]133;C\x1b\\out")
+    assert kinds(events) == ['start', 'text']
+
+
+def test_unrelated_escape_at_chunk_end_is_not_held():
+    segmenter = CommandSegmenter()
+    assert segmenter.feed("red\x1b[31m") == [('text', "red\x1b[31m")]
+
+
+def test_completion_candidates_arrive_as_command_text():
+    # bash 在提示符和下一个提示符之间输出Tab补全的候选列表，属于命令输入区间
+    segmenter = CommandSegmenter()
+    segmenter.feed(f"{A}$ {B}")
+    events = segmenter.feed(f"ls /et\r\netc/  etcd/\r\n{D(0)}{A}$ {B}ls /etc")
+    assert events[0] == ('command_text', "ls /et\r\netc/  etcd/\r\n")
+
+
+def test_completion_reply_reaches_ui_with_shell_integration():
+    pytest.importorskip("paramiko")
+    from ssh_client import SSHClient
+
+    client = SSHClient()
+    client.segmenter.feed(f"{A}$ {B}")      # Tab 之前提示符已经显示
+    client.channel = FakeChannel([])
+    client.connected = True
+    client.send_raw("\t")
+    assert client.tab_completion
+    items = receive_all(client, [f"ls /et\r\netc/  etcd/\r\n{D(0)}{A}$ {B}"], 2)
+    texts = [item for item in items if isinstance(item, str)]
+    assert any("etcd/" in text for text in texts)
+    assert not client.tab_completion
+
+
+def test_command_echo_hidden_without_completion():
+    pytest.importorskip("paramiko")
+    from ssh_client import SSHClient
+
+    items = receive_all(SSHClient(), [f"{A}$ {B}ls\r\n{C}out\r\n"], 3)
+    assert [item for item in items if isinstance(item, str)] == ["out\r\n"]
+
+
+def test_fast_forward_keeps_markers_in_place():
+    pytest.importorskip("paramiko")
+    from ssh_client import fast_forward_frames
+
+    items = ['a\nb\n', ('start', 1), 'c\nd\ne', ('end', 1), 'f']
+    assert fast_forward_frames(items, 2) == [('start', 1), "[快进] 已跳过 5 行输出\ne", ('end', 1), 'f']
+    assert fast_forward_frames(items, 100) == items
+
+
+def test_fast_forward_merges_adjacent_text():
+    pytest.importorskip("paramiko")
+    from ssh_client import fast_forward_frames
+
+    assert fast_forward_frames(['1\n', '2\n', '3'], 2) == ["[快进] 已跳过 1 行输出\n2\n3"]
+
+
+def test_unterminated_marker_tail_is_released():
+    segmenter = CommandSegmenter()
+    assert segmenter.feed("\x1b]133;") == []
+    junk = "x" * 100
+    events = segmenter.feed(junk)
+    assert events == [('text', "\x1b]133;" + junk)]
+    assert segmenter.pending == ""
+
+
+def test_bash_hook_only_installs_with_ps0_support():
+    import shutil
+    import subprocess
+    from shell_integration import BASH_HOOK
+
+    bash = shutil.which("bash")
+    if not bash:
+        pytest.skip("需要 bash")
+    script = f"{BASH_HOOK}\n" + 'printf "%s|" "${PS0+set}"'
+    result = subprocess.run([bash, "--norc", "-c", script], capture_output=True, text=True)
+    # 当前 bash 支持 PS0 时钩子生效；伪装成旧版本时不注入
+    assert result.stdout == "set|"
+    old = subprocess.run([bash, "--norc", "-c", "BASH_VERSION=4.3.48; " + script],
+                         capture_output=True, text=True)
+    assert old.stdout == "|"
+    assert old.stderr == ""
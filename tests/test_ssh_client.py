@@ -0,0 +1,18 @@
+import pytest
+
+pytest.importorskip("paramiko")
+
+from fakes import receive_all
+from ssh_client import MAX_BUFFERED, SSHClient
+
+
+def test_output_without_newlines_is_delivered_in_bounded_chunks():
+    chunk = "A" * 1024
+    items = receive_all(SSHClient(), [chunk] * 200, 3)
+    assert len(items) >= 3
+    assert all(len(item) < MAX_BUFFERED + len(chunk) for item in items)
+
+
+def test_prompt_split_across_chunks_flushes_line():
+    items = receive_all(SSHClient(), ["[root@host ~]", "# "], 1)
+    assert items == ["[root@host ~]# "]
@@ -0,0 +1,44 @@
+import pytest
+
+paramiko = pytest.importorskip("paramiko")
+
+from transport_profile import (PROFILES, SHELL_WINDOW_LIMIT, TransportProfile, choose_profile,
+                               get_profile)
+
+
+def test_unknown_profile_falls_back_to_default():
+    assert get_profile(None) is PROFILES['default']
+    assert get_profile('missing') is PROFILES['default']
+
+
+def test_default_profile_changes_nothing():
+    assert PROFILES['default'].connect_kwargs() == {'compress': False}
+
+
+def test_cipher_preference_disables_other_algorithms():
+    kwargs = PROFILES['lan'].connect_kwargs()
+    disabled = kwargs['disabled_algorithms']['ciphers']
+    assert 'aes128-ctr' not in disabled and 'aes256-ctr' not in disabled
+    assert set(disabled) | {'aes128-ctr', 'aes256-ctr'} >= set(paramiko.Transport._preferred_ciphers)
+
+
+def test_unsupported_preference_keeps_defaults():
+    profile = TransportProfile('x', "x", ciphers=['no-such-cipher'])
+    assert 'disabled_algorithms' not in profile.connect_kwargs()
+
+
+def test_shell_window_is_capped():
+    assert PROFILES['wan'].shell_window_size() == SHELL_WINDOW_LIMIT
+    assert PROFILES['default'].shell_window_size() is None
+
+
+def test_choose_highest_throughput_among_responsive():
+    results = [('default', 0.010, 10e6),
+               ('lan', 0.011, 50e6),       # 延迟在1.2倍以内，吞吐最高
+               ('wan', 0.020, 90e6),       # 吞吐更高但回显明显变慢
+               ('slow', None, "连接失败")]
+    assert choose_profile(results) == 'lan'
+
+
+def test_choose_none_when_all_failed():
+    assert choose_profile([('default', None, "超时"), ('lan', None, "超时")]) is None
@@ -0,0 +1,155 @@
+import socket
+import time
+import paramiko
+
+MEASURE_TIMEOUT = 15                        # 测量时单次读取的超时秒数
+SHELL_WINDOW_LIMIT = 4 * 1024 * 1024        # 交互式终端通道的窗口上限
+
+
+class TransportProfile:
+    """SSH传输参数配置：窗口大小、最大包长、压缩及可用加密/MAC算法"""
+    def __init__(self, name, title, window_size=None, max_packet_size=None, compress=False,
+                 ciphers=None, macs=None):
+        self.name = name
+        self.title = title
+        self.window_size = window_size            # None 表示使用paramiko默认值
+        self.max_packet_size = max_packet_size
+        self.compress = compress
+        self.ciphers = ciphers                    # 按优先级排列，None 表示不限制
+        self.macs = macs
+
+    def connect_kwargs(self):
+        """返回传给 paramiko.SSHClient.connect 的参数
+
+        paramiko不支持直接指定算法顺序，这里通过禁用配置外的算法实现；
+        若本地一个都不支持则保持默认，避免无法连接。
+        """
+        kwargs = {'compress': self.compress}
+        disabled = {}
+        for kind, wanted, supported in (('ciphers', self.ciphers, paramiko.Transport._preferred_ciphers),
+                                        ('macs', self.macs, paramiko.Transport._preferred_macs)):
+            if wanted and any(name in supported for name in wanted):
+                disabled[kind] = [name for name in supported if name not in wanted]
+        if disabled:
+            kwargs['disabled_algorithms'] = disabled
+        return kwargs
+
+    def shell_window_size(self):
+        """交互式终端通道的窗口大小
+
+        终端输出的背压在 SSH 窗口用完后才传到服务器，大窗口意味着刷屏时
+        会先在本地积压同样多的数据，因此终端通道的窗口不超过 SHELL_WINDOW_LIMIT，
+        大窗口只用于端口转发等批量传输的通道。
+        """
+        if not self.window_size:
+            return None
+        return min(self.window_size, SHELL_WINDOW_LIMIT)
+
+    def apply(self, transport):
+        """设置之后打开的通道使用的窗口和包大小"""
+        if self.window_size:
+            transport.default_window_size = self.window_size
+        if self.max_packet_size:
+            transport.default_max_packet_size = self.max_packet_size
+
+
+PROFILES = {
+    'default': TransportProfile('default', "默认"),
+    # 高带宽低延迟：大窗口、不压缩、优先最快的CTR模式
+    'lan': TransportProfile('lan', "局域网 (高带宽)", window_size=16 * 1024 * 1024,
+                            max_packet_size=32768, compress=False,
+                            ciphers=['aes128-ctr', 'aes256-ctr'],
+                            macs=['hmac-sha2-256-etm@openssh.com', 'hmac-sha2-256']),
+    # 高延迟：窗口需覆盖带宽时延积，否则吞吐被窗口限制
+    'wan': TransportProfile('wan', "广域网/卫星 (高延迟)", window_size=64 * 1024 * 1024,
+                            max_packet_size=32768, compress=False,
+                            ciphers=['aes128-ctr', 'aes256-ctr']),
+    # 低带宽：启用压缩换取更少的传输字节
+    'slow': TransportProfile('slow', "低带宽 (压缩)", window_size=4 * 1024 * 1024, compress=True),
+}
+
+
+def get_profile(name):
+    """按名称取配置，未知名称返回默认配置"""
+    return PROFILES.get(name or 'default', PROFILES['default'])
+
+
+def _measure(transport, payload_size, rounds):
+    """测量回显往返时间（秒）和批量输出吞吐量（字节/秒）
+
+    需要远端支持 cat 和 head -c；不支持或无响应时抛出异常，不会一直等待。
+    """
+    chan = transport.open_session()
+    chan.settimeout(MEASURE_TIMEOUT)
+    try:
+        chan.exec_command('cat')
+        rtts = []
+        for _ in range(rounds):
+            start = time.time()
+            chan.send(b'x')
+            if not chan.recv(1):
+                raise EOFError("远端不支持 cat 回显测试")
+            rtts.append(time.time() - start)
+    except socket.timeout:
+        raise TimeoutError("回显测试超时")
+    finally:
+        chan.close()
+
+    chan = transport.open_session()
+    chan.settimeout(MEASURE_TIMEOUT)
+    try:
+        chan.exec_command(f'head -c {payload_size} /dev/urandom')
+        start = time.time()
+        received = 0
+        while True:
+            data = chan.recv(65536)
+            if not data:
+                break
+            received += len(data)
+        elapsed = max(time.time() - start, 1e-6)
+    except socket.timeout:
+        raise TimeoutError("吞吐量测试超时")
+    finally:
+        chan.close()
+    if not received:
+        raise EOFError("远端不支持 head -c 吞吐量测试")
+
+    rtts.sort()
+    return rtts[len(rtts) // 2], received / elapsed
+
+
+def auto_tune(connect_args, candidates=None, payload_size=8 * 1024 * 1024, rounds=5, progress=None):
+    """对主机逐一测量候选配置，返回 (最优配置名, [(配置名, RTT, 吞吐量或错误)])"""
+    from ssh_client import SSHClient
+
+    results = []
+    for name in candidates or list(PROFILES):
+        if progress:
+            progress(f"正在测试 {get_profile(name).title} ...")
+        client = SSHClient()
+        success, message = client.connect(transport_profile=name, shell=False, **connect_args)
+        if not success:
+            results.append((name, None, message))
+            continue
+        try:
+            rtt, throughput = _measure(client.transport, payload_size, rounds)
+            results.append((name, rtt, throughput))
+        except Exception as e:
+            results.append((name, None, str(e)))
+        finally:
+            client.disconnect()
+
+    return choose_profile(results), results
+
+
+def choose_profile(results):
+    """从 [(配置名, RTT, 吞吐量或错误)] 中选出最优配置名，全部失败时返回 None
+
+    在回显延迟不明显变差（不超过最佳值的1.2倍）的配置中选吞吐量最高的。
+    """
+    measured = [r for r in results if r[1] is not None]
+    if not measured:
+        return None
+    best_rtt = min(r[1] for r in measured)
+    responsive = [r for r in measured if r[1] <= best_rtt * 1.2]
+    return max(responsive, key=lambda r: r[2])[0]